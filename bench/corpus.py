@@ -0,0 +1,95 @@
+"""
+Benchmark corpus: the recorded pages in bench/fixtures plus large and
+pathological pages generated here (deterministically, so they need not be
+committed).
+"""
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+LISTING_URL = "https://bench.example.com/careers/"
+BAMBOOHR_URL = "https://example.bamboohr.com/careers"
+WORKDAY_URL = "https://example.wd3.myworkdayjobs.com/en-US/External"
+WORKDAY_API_URL = "https://example.wd3.myworkdayjobs.com/wday/cxs/example/External/jobs"
+
+ROLES = ["Royalties Assistant", "Rights Coordinator", "Metadata Intern", "Senior Label Manager", "Publishing Administrator"]
+
+
+def _fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _large_generic_listing(links: int = 5000) -> str:
+    rows = []
+    for i in range(links):
+        role = ROLES[i % len(ROLES)]
+        href = f"/careers/{role.lower().replace(' ', '-')}-{i}/?utm_source=board&ref=home"
+        if i % 7 == 0:
+            href = f"/news/{i}"
+        rows.append(f'<li class="row"><div><a href="{href}">{role} {i}</a><span>London</span></div></li>')
+    return "<html><body><nav>" + "<a href='/'>Home</a>" * 200 + "</nav><ul>" + "".join(rows) + "</ul></body></html>"
+
+
+def _large_mbw_listing(cards: int = 1500) -> str:
+    # <article> cards inside <li> inside .job: the three mbw selectors all overlap.
+    cards_html = []
+    for i in range(cards):
+        role = ROLES[i % len(ROLES)]
+        cards_html.append(
+            f'<li class="job"><article><h2><a href="https://www.musicbusinessworldwide.com/jobs/{i}/">'
+            f"{role} - Label {i}</a></h2><time>{i % 28 + 1} October 2026</time></article></li>"
+        )
+    return "<html><body><ul>" + "".join(cards_html) + "</ul></body></html>"
+
+
+def _long_detail(sections: int = 200, bullets: int = 15) -> str:
+    parts = ["<html><body><header><nav>" + "<a href='/x'>Menu</a>" * 100 + "</nav></header><main><h1>Royalties Assistant</h1>"]
+    for s in range(sections):
+        heading = ["Responsibilities", "Requirements", "About us", "Benefits", "What you'll need"][s % 5]
+        parts.append(f"<h2>{heading} {s}</h2><ul>")
+        for b in range(bullets):
+            parts.append(
+                f"<li>Item {s}-{b}: work with royalty statements, excel reporting and clear communication "
+                f"<strong>across</strong> <em>teams</em></li>"
+            )
+        parts.append("</ul><p>Apply via jobs@example.com for this job.</p>")
+    parts.append("</main><footer>Privacy policy cookies terms</footer></body></html>")
+    return "".join(parts)
+
+
+def _deep_detail(depth: int = 400) -> str:
+    opening = "".join(f"<div class='d{i}'><span>level {i} job</span>" for i in range(depth))
+    closing = "</div>" * depth
+    return (
+        "<html><body><h2>Key Responsibilities</h2><div><ul><li>Process royalty data</li></ul></div>"
+        + opening
+        + "<ul><li>Excel</li><li>Communication</li></ul>"
+        + closing
+        + "</body></html>"
+    )
+
+
+def listing_cases() -> list[tuple[str, str, str, dict[str, str]]]:
+    """(case name, parser_type, source url, {url: response body})"""
+    return [
+        ("generic", "generic", LISTING_URL, {LISTING_URL: _fixture("listing_generic.html")}),
+        ("generic_large", "generic", LISTING_URL, {LISTING_URL: _large_generic_listing()}),
+        ("bamboohr", "bamboohr", BAMBOOHR_URL, {BAMBOOHR_URL + "/list": _fixture("listing_bamboohr_list.json")}),
+        ("workday", "workday", WORKDAY_URL, {WORKDAY_API_URL: _fixture("listing_workday_jobs.json")}),
+        # not on myworkdayjobs.com: the static HTML scan
+        ("workday_html", "workday", LISTING_URL, {LISTING_URL: _fixture("listing_workday.html")}),
+        ("mbw", "mbw", LISTING_URL, {LISTING_URL: _fixture("listing_mbw.html")}),
+        ("mbw_large", "mbw", LISTING_URL, {LISTING_URL: _large_mbw_listing()}),
+        ("musicweek", "musicweek", LISTING_URL, {LISTING_URL: _fixture("listing_musicweek.html")}),
+    ]
+
+
+def detail_cases() -> list[tuple[str, str]]:
+    """(case name, html)"""
+    return [
+        ("heuristic", _fixture("detail_heuristic.html")),
+        ("json_ld", _fixture("detail_json_ld.html")),
+        ("long", _long_detail()),
+        ("deep", _deep_detail()),
+    ]
@@ -0,0 +1,139 @@
+"""
+Memory footprint and construction time of models.Job and CSV row throughput for
+a large run.
+
+    python bench/memory_bench.py              # 100k jobs
+    python bench/memory_bench.py --jobs 20000
+
+Compares the current Job against a plain dataclass with the same fields (the
+previous representation). Strings are built per job, as the parsers do, so
+repeated values are only shared when Job interns them.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, fields
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from models import CSV_HEADERS, Job  # noqa: E402
+
+COMPANIES = ["Beggars Group", "Merlin", "Warner Chappell", "Kobalt", "Domino Recording", "Ninja Tune"]
+CITIES = ["London", "New York", "Berlin", "Los Angeles", "Paris"]
+CHANNELS = ["Company Website", "Job Board", "ATS"]
+COUNTRIES = ["UK", "US", "DE", "FR"]
+
+
+@dataclass
+class PlainJob:
+    """models.Job before slots and interning."""
+
+    base_country: str = ""
+    company: str = ""
+    title: str = ""
+    base_city: str = ""
+    posting_date: str = ""
+    channel: str = ""
+    category: str = ""
+    job_type: str = ""
+    start_date: str = ""
+    end_date: str = ""
+    responsibilities: str = ""
+    hard_skills: str = ""
+    soft_skills: str = ""
+    url: str = ""
+    contact: str = ""
+
+
+def _fresh(text: str) -> str:
+    # a new str object with the same value, like a freshly parsed page would give
+    return "".join(list(text))
+
+
+def make_jobs(cls, count: int) -> list:
+    jobs = []
+    for i in range(count):
+        jobs.append(
+            cls(
+                base_country=_fresh(COUNTRIES[i % len(COUNTRIES)]),
+                company=_fresh(COMPANIES[i % len(COMPANIES)]),
+                title=f"Royalties Assistant {i}",
+                base_city=_fresh(CITIES[i % len(CITIES)]),
+                posting_date=f"2026-10-{i % 28 + 1:02d}",
+                channel=_fresh(CHANNELS[i % len(CHANNELS)]),
+                job_type=_fresh("Full-time"),
+                responsibilities=f"Process royalty statements for catalogue {i}; reconcile income.",
+                hard_skills="Excel; SQL",
+                soft_skills="Communication",
+                url=f"https://jobs.example.com/royalties-assistant-{i}",
+            )
+        )
+    return jobs
+
+
+def measure_memory(cls, count: int) -> float:
+    """Bytes allocated per job while building `count` of them."""
+    tracemalloc.start()
+    try:
+        jobs = make_jobs(cls, count)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del jobs
+    return current / count
+
+
+def measure_construction(cls, count: int) -> float:
+    """Seconds to build `count` jobs (building the field strings included, same for both classes)."""
+    start = time.perf_counter()
+    make_jobs(cls, count)
+    return time.perf_counter() - start
+
+
+def measure_csv(jobs: list, rows: str) -> float:
+    """Seconds to write all jobs as CSV rows, via dict rows or tuple rows."""
+    out = io.StringIO()
+    start = time.perf_counter()
+    if rows == "dict":
+        writer = csv.DictWriter(out, fieldnames=CSV_HEADERS)
+        writer.writeheader()
+        for job in jobs:
+            writer.writerow(job.to_csv_row())
+    else:
+        writer = csv.writer(out)
+        writer.writerow(CSV_HEADERS)
+        for job in jobs:
+            writer.writerow(job.to_csv_tuple())
+    return time.perf_counter() - start
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Job memory footprint, construction and CSV row benchmark.")
+    parser.add_argument("--jobs", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    plain = measure_memory(PlainJob, args.jobs)
+    compact = measure_memory(Job, args.jobs)
+    print(f"{'representation':<16} {'bytes/job':>10} {'MB total':>10}")
+    for name, per_job in (("plain dataclass", plain), ("models.Job", compact)):
+        print(f"{name:<16} {per_job:>10.0f} {per_job * args.jobs / 1e6:>10.1f}")
+    print(f"saving: {1 - compact / plain:.0%} ({len(fields(Job))} fields)")
+
+    plain_seconds = measure_construction(PlainJob, args.jobs)
+    job_seconds = measure_construction(Job, args.jobs)
+    print(f"construction: plain dataclass {plain_seconds:.2f}s, models.Job {job_seconds:.2f}s")
+
+    jobs = make_jobs(Job, args.jobs)
+    dict_seconds = measure_csv(jobs, "dict")
+    tuple_seconds = measure_csv(jobs, "tuple")
+    print(f"csv rows: dict {dict_seconds:.2f}s, tuple {tuple_seconds:.2f}s ({dict_seconds / tuple_seconds:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
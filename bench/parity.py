@@ -0,0 +1,92 @@
+"""
+Checks that the listing strainers and the HTML parser backend do not change what
+is extracted: every corpus page is parsed with and without strainers, under
+html.parser and lxml, and the results must match the full html.parser parse.
+
+    python bench/parity.py      # exit 1 on any difference
+
+Pages come from bench/corpus.py; nothing touches the network. lxml is skipped
+(with a note) when it is not installed.
+"""
+import importlib.util
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+sys.path.insert(0, BENCH_DIR)
+
+import corpus  # noqa: E402
+from detail_fetcher import enrich_job_details  # noqa: E402
+from models import Job  # noqa: E402
+from run_bench import FixtureSession, _listing_call  # noqa: E402
+from utils import set_html_parser, set_strainers  # noqa: E402
+
+REFERENCE = ("html.parser", False)
+
+
+def _listing_result(parser_type: str, url: str, pages: dict[str, str]) -> list[dict]:
+    return [job.as_dict() for job in _listing_call(parser_type, url, pages)()]
+
+
+def _detail_result(html: str) -> tuple:
+    url = "https://bench.example.com/job/1"
+    job = Job(title="Royalties Assistant", url=url)
+    outcome = enrich_job_details(job, FixtureSession({url: html}), {})
+    return outcome, job.as_dict()
+
+
+def _variants() -> list[tuple[str, bool]]:
+    backends = ["html.parser"]
+    if importlib.util.find_spec("lxml") is not None:
+        backends.append("lxml")
+    else:
+        print("lxml is not installed: only html.parser is checked")
+    return [(backend, strained) for backend in backends for strained in (True, False)]
+
+
+def _run(variant: tuple[str, bool], fn):
+    backend, strained = variant
+    set_html_parser(backend)
+    set_strainers(strained)
+    try:
+        return fn()
+    finally:
+        set_html_parser("html.parser")
+        set_strainers(True)
+
+
+def check() -> list[str]:
+    """Names of the (case, backend, strained) combinations whose results differ from the reference."""
+    cases = [
+        (f"listing:{name}", lambda args=(parser_type, url, pages): _listing_result(*args))
+        for name, parser_type, url, pages in corpus.listing_cases()
+    ]
+    cases += [(f"detail:{name}", lambda html=html: _detail_result(html)) for name, html in corpus.detail_cases()]
+
+    differences = []
+    variants = _variants()
+    for name, fn in cases:
+        expected = _run(REFERENCE, fn)
+        for variant in variants:
+            if variant == REFERENCE:
+                continue
+            label = f"{name} {variant[0]}{' strained' if variant[1] else ''}"
+            same = _run(variant, fn) == expected
+            print(f"{label:<44} {'ok' if same else 'DIFFERENT'}")
+            if not same:
+                differences.append(label)
+    return differences
+
+
+def main() -> int:
+    differences = check()
+    if differences:
+        print(f"{len(differences)} combinations extract something different: {', '.join(differences)}")
+        return 1
+    print("All combinations extract the same jobs and details.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
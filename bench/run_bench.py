@@ -0,0 +1,189 @@
+"""
+Offline benchmark for the listing parsers and enrich_job_details.
+
+    python bench/run_bench.py                  # run and print a report
+    python bench/run_bench.py --save-baseline  # store results in bench/baseline.json
+    python bench/run_bench.py --compare        # fail if a case is slower than the baseline
+
+Pages come from bench/corpus.py; nothing touches the network.
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src")
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import corpus  # noqa: E402
+from detail_fetcher import enrich_job_details  # noqa: E402
+from main import PARSER_MAP  # noqa: E402
+from models import Job  # noqa: E402
+from utils import set_html_parser  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+MIN_SECONDS = 0.5
+
+
+class FixtureSession:
+    """Stands in for requests.Session: answers each URL with its page from `pages`, others with a 404."""
+
+    def __init__(self, pages: dict[str, str]):
+        self.bodies = {url: body.encode("utf-8") for url, body in pages.items()}
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        resp = requests.Response()
+        resp.status_code = 200 if url in self.bodies else 404
+        resp._content = self.bodies.get(url, b"")
+        resp.encoding = "utf-8"
+        resp.url = url
+        return resp
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+def _listing_call(parser_type: str, url: str, pages: dict[str, str]):
+    parser = PARSER_MAP[parser_type]
+    source = {
+        "id": f"bench_{parser_type}",
+        "name": "Bench",
+        "channel": "Bench",
+        "url": url,
+        "parser_type": parser_type,
+    }
+    session = FixtureSession(pages)
+    return lambda: parser(source, session)
+
+
+def _detail_call(html: str):
+    url = "https://bench.example.com/job/1"
+    session = FixtureSession({url: html})
+    return lambda: enrich_job_details(Job(title="Royalties Assistant", url=url), session, {})
+
+
+def _time_call(fn, repeat: int | None) -> tuple[int, float]:
+    fn()  # warm-up
+    runs, elapsed = 0, 0.0
+    while (repeat is None and elapsed < MIN_SECONDS) or (repeat is not None and runs < repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed += time.perf_counter() - start
+        runs += 1
+    return runs, elapsed
+
+
+def _peak_memory_kb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def _top_functions(fn, limit: int = 5) -> list[dict]:
+    """Cumulative time of the project's own functions, heaviest first."""
+    profiler = cProfile.Profile()
+    profiler.runcall(fn)
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, lineno, name), (_, _, _, cumtime, _) in stats.stats.items():
+        if not os.path.abspath(filename).startswith(SRC_DIR):
+            continue
+        module = os.path.splitext(os.path.relpath(filename, SRC_DIR))[0].replace(os.sep, ".")
+        rows.append({"function": f"{module}:{lineno}({name})", "cumulative_ms": round(cumtime * 1000, 2)})
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[1 : limit + 1]  # rows[0] is the parser / enrich_job_details call itself
+
+
+def run_cases(only: str | None, repeat: int | None) -> dict:
+    cases = [
+        (f"listing:{name}", _listing_call(parser_type, url, pages))
+        for name, parser_type, url, pages in corpus.listing_cases()
+    ]
+    cases += [(f"detail:{name}", _detail_call(html)) for name, html in corpus.detail_cases()]
+
+    results = {}
+    for name, fn in cases:
+        if only and only not in name:
+            continue
+        runs, elapsed = _time_call(fn, repeat)
+        results[name] = {
+            "pages_per_sec": round(runs / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(elapsed / runs * 1000, 3),
+            "peak_kb": _peak_memory_kb(fn),
+            "top_functions": _top_functions(fn),
+        }
+    return results
+
+
+def print_report(results: dict) -> None:
+    print(f"{'case':<24} {'pages/sec':>10} {'mean ms':>10} {'peak KB':>10}  hottest functions")
+    for name, row in results.items():
+        hot = ", ".join(f"{f['function']} {f['cumulative_ms']}ms" for f in row["top_functions"][:3])
+        print(f"{name:<24} {row['pages_per_sec']:>10} {row['mean_ms']:>10} {row['peak_kb']:>10}  {hot}")
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Cases whose throughput dropped by more than `threshold` against the baseline."""
+    slower = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if not base or not row["pages_per_sec"]:
+            continue
+        slowdown = base["pages_per_sec"] / row["pages_per_sec"] - 1
+        status = "SLOWER" if slowdown > threshold else "ok"
+        print(f"{name:<24} baseline={base['pages_per_sec']:>10} now={row['pages_per_sec']:>10} change={-slowdown:+.0%} {status}")
+        if slowdown > threshold:
+            slower.append(name)
+    return slower
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline parser/enrichment benchmark.")
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=None, help=f"runs per case (default: as many as fit in {MIN_SECONDS}s)")
+    parser.add_argument("--html-parser", default="html.parser", help="BeautifulSoup backend to benchmark")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline, exit 1 on slowdowns")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    set_html_parser(args.html_parser)
+    results = run_cases(args.only, args.repeat)
+    print_report(results)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    if args.compare:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            slower = compare(results, json.load(f), args.threshold)
+        if slower:
+            print(f"Slower than baseline by more than {args.threshold:.0%}: {', '.join(slower)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
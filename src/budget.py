@@ -0,0 +1,47 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import requests
+
+_local = threading.local()
+
+
+class BudgetExceeded(requests.Timeout):
+    """A request was not sent because the time budget of its source or of the run is used up."""
+
+
+class Deadline:
+    """A point in time (monotonic clock) that never lies past its parent's deadline."""
+
+    def __init__(self, seconds: float | None = None, parent: "Deadline | None" = None):
+        at = time.monotonic() + float(seconds) if seconds is not None else None
+        if parent is not None and parent.at is not None:
+            at = parent.at if at is None else min(at, parent.at)
+        self.at = at
+
+    def remaining(self) -> float | None:
+        return None if self.at is None else max(0.0, self.at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.at is not None and time.monotonic() >= self.at
+
+    def cap(self, seconds: float) -> float:
+        remaining = self.remaining()
+        return seconds if remaining is None else min(seconds, remaining)
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline | None) -> Iterator[None]:
+    """Make `deadline` apply to every safe_get call on this thread while inside the block."""
+    previous = getattr(_local, "deadline", None)
+    _local.deadline = deadline
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def current_deadline() -> Deadline | None:
+    return getattr(_local, "deadline", None)
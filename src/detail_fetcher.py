@@ -1,12 +1,14 @@
+import bisect
+import html
 import json
 import logging
 import re
-import time
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString, Tag
 
-from models import Job
-from utils import GLOBAL_EXCLUDE_PATTERNS, normalize_text, safe_get
+from budget import BudgetExceeded
+from models import INTERNED_FIELDS, Job, interned
+from utils import GLOBAL_EXCLUDE_PATTERNS, make_soup, normalize_text, safe_get
 
 RESPONSIBILITY_HEADINGS = [
     "responsibilities",
@@ -73,27 +75,129 @@ SOFT_SKILL_KEYWORDS = [
     "adaptability",
 ]
 
+# Job fields filled in from the detail page (reused from state for already-enriched URLs).
+ENRICHED_FIELDS = [
+    "base_city",
+    "base_country",
+    "posting_date",
+    "end_date",
+    "job_type",
+    "responsibilities",
+    "hard_skills",
+    "soft_skills",
+    "contact",
+]
+# Fields the listing may already carry; detail values only fill them when empty.
+LISTING_FIELDS = {"base_city", "base_country", "posting_date", "end_date", "job_type"}
+
+EMPLOYMENT_TYPES = {
+    "INTERN": "internship",
+    "PART_TIME": "part-time",
+    "FULL_TIME": "full-time",
+    "CONTRACTOR": "contract",
+    "TEMPORARY": "contract",
+}
+
+COUNTRY_NAMES = {
+    "GB": "UK",
+    "UK": "UK",
+    "UNITED KINGDOM": "UK",
+    "US": "US",
+    "USA": "US",
+    "UNITED STATES": "US",
+    "UNITED STATES OF AMERICA": "US",
+}
+
 EMAIL_REGEX = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 
 
-def _clean_soup(soup: BeautifulSoup) -> None:
-    for tag in soup(["script", "style", "nav", "footer", "header"]):
-        tag.decompose()
+SKIPPED_TAGS = {"script", "style", "nav", "footer", "header"}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "strong", "b"}
+SECTION_TAGS = {"h1", "h2", "h3", "h4"}
+
+HARD_SKILL_REGEX = re.compile("|".join(re.escape(key) for key in HARD_SKILL_KEYWORDS))
+SOFT_SKILL_REGEX = re.compile("|".join(re.escape(key) for key in SOFT_SKILL_KEYWORDS))
+
+
+class _PageScan:
+    """
+    Everything enrich_job_details needs from a page, collected in one tree walk:
+    visible strings, the string range and pre-order position of every tag,
+    list items, headings and raw JSON-LD blocks. Script/style/nav/footer/header
+    subtrees are skipped, as if they had been removed from the page.
+    """
+
+    def __init__(self, soup: BeautifulSoup):
+        self.strings: list[str] = []
+        self.json_ld: list[str] = []
+        self.headings: list[Tag] = []
+        self.li_positions: list[int] = []
+        self.li_tags: list[Tag] = []
+        self._spans: dict[int, tuple[int, int]] = {}
+        self._order: dict[int, tuple[int, int]] = {}
+        self._walk(soup)
+
+    def _walk(self, root: BeautifulSoup) -> None:
+        position = 0
+        stack: list = [(root, None)]
+        while stack:
+            node, entered = stack.pop()
+            if entered is not None:
+                first_string, first_position = entered
+                self._spans[id(node)] = (first_string, len(self.strings))
+                self._order[id(node)] = (first_position, position - 1)
+                continue
+            if type(node) is NavigableString:
+                value = node.strip()
+                if value:
+                    self.strings.append(value)
+                continue
+            if not isinstance(node, Tag):
+                continue
+            if node.name in SKIPPED_TAGS:
+                if node.name == "script" and node.get("type") == "application/ld+json":
+                    self.json_ld.append(node.string or node.get_text() or "")
+                continue
+
+            if node.name == "li":
+                self.li_positions.append(position)
+                self.li_tags.append(node)
+            elif node.name in HEADING_TAGS:
+                self.headings.append(node)
+            stack.append((node, (len(self.strings), position)))
+            position += 1
+            stack.extend((child, None) for child in reversed(node.contents))
+
+    def text(self, tag: Tag) -> str:
+        """Same as normalize_text(tag.get_text(" ", strip=True)) on the cleaned page."""
+        start, end = self._spans.get(id(tag), (0, 0))
+        return normalize_text(" ".join(self.strings[start:end]))
+
+    def full_text(self) -> str:
+        return normalize_text("\n".join(self.strings))
+
+    def bullets(self) -> list[str]:
+        return [value for value in (self.text(li) for li in self.li_tags) if value]
+
+    def lis_inside(self, tag: Tag) -> list[Tag]:
+        if id(tag) not in self._order:
+            return []
+        first, last = self._order[id(tag)]
+        lo = bisect.bisect_right(self.li_positions, first)
+        hi = bisect.bisect_right(self.li_positions, last)
+        return self.li_tags[lo:hi]
+
+    def next_sibling(self, tag: Tag) -> Tag | None:
+        sibling = tag.find_next_sibling()
+        while sibling is not None and sibling.name in SKIPPED_TAGS:
+            sibling = sibling.find_next_sibling()
+        return sibling
 
 
 def _to_lines(text: str) -> list[str]:
     return [normalize_text(x) for x in text.split("\n") if normalize_text(x)]
 
 
-def _extract_all_bullets(soup: BeautifulSoup) -> list[str]:
-    bullets = []
-    for li in soup.find_all("li"):
-        value = normalize_text(li.get_text(" ", strip=True))
-        if value:
-            bullets.append(value)
-    return bullets
-
-
 def _join_limited(items: list[str], max_chars: int) -> str:
     if not items:
         return ""
@@ -101,101 +205,231 @@ def _join_limited(items: list[str], max_chars: int) -> str:
     return text[:max_chars]
 
 
-def _heading_block_lines(soup: BeautifulSoup, heading_keywords: list[str], max_siblings: int = 5) -> list[str]:
-    collected = []
-    headings = soup.find_all(["h1", "h2", "h3", "h4", "strong", "b"])
-    for heading in headings:
-        heading_text = normalize_text(heading.get_text(" ", strip=True)).lower()
-        if not any(key in heading_text for key in heading_keywords):
+def _heading_sections(scan: _PageScan, keyword_groups: list[list[str]], max_siblings: int = 5) -> list[list[str]]:
+    """
+    For each keyword group, the li/p/div/span lines following the first heading(s)
+    whose text contains one of the keywords. All groups share one pass over the headings.
+    """
+    collected: list[list[str]] = [[] for _ in keyword_groups]
+    done = [False] * len(keyword_groups)
+    for heading in scan.headings:
+        if all(done):
+            break
+        heading_text = scan.text(heading).lower()
+        groups = [
+            index
+            for index, keywords in enumerate(keyword_groups)
+            if not done[index] and any(key in heading_text for key in keywords)
+        ]
+        if not groups:
             continue
 
+        lines = []
         sibling = heading
         scanned = 0
         while scanned < max_siblings:
-            sibling = sibling.find_next_sibling()
+            sibling = scan.next_sibling(sibling)
             if sibling is None:
                 break
             scanned += 1
-            if sibling.name in ["h1", "h2", "h3", "h4"]:
+            if sibling.name in SECTION_TAGS:
                 break
 
-            for li in sibling.select("li"):
-                line = normalize_text(li.get_text(" ", strip=True))
+            for li in scan.lis_inside(sibling):
+                line = scan.text(li)
                 if line:
-                    collected.append(line)
+                    lines.append(line)
             if sibling.name in ["p", "div", "span"]:
-                line = normalize_text(sibling.get_text(" ", strip=True))
+                line = scan.text(sibling)
                 if line:
-                    collected.append(line)
+                    lines.append(line)
 
-        if collected:
-            return collected
+        for index in groups:
+            collected[index].extend(lines)
+            done[index] = bool(collected[index])
 
-    return []
+    return [lines if done[index] else [] for index, lines in enumerate(collected)]
 
 
 def _split_hard_soft(lines: list[str]) -> tuple[list[str], list[str]]:
     hard, soft = [], []
     for line in lines:
         lowered = line.lower()
-        hard_match = any(key in lowered for key in HARD_SKILL_KEYWORDS)
-        soft_match = any(key in lowered for key in SOFT_SKILL_KEYWORDS)
-        if hard_match:
+        if HARD_SKILL_REGEX.search(lowered):
             hard.append(line)
-        if soft_match:
+        if SOFT_SKILL_REGEX.search(lowered):
             soft.append(line)
     return hard, soft
 
 
 def _dedupe_lines(lines: list[str]) -> list[str]:
+    """Lines are already normalised by _PageScan, so only case is folded here."""
     seen = set()
     out = []
     for line in lines:
-        key = normalize_text(line).lower()
+        key = line.lower()
         if not key or key in seen:
             continue
         seen.add(key)
-        out.append(normalize_text(line))
+        out.append(line)
     return out
 
 
 def _remove_overlap(primary: list[str], secondary: list[str]) -> list[str]:
-    secondary_keys = {normalize_text(x).lower() for x in secondary}
-    return [x for x in primary if normalize_text(x).lower() not in secondary_keys]
+    secondary_keys = {x.lower() for x in secondary}
+    return [x for x in primary if x.lower() not in secondary_keys]
 
 
-def _extract_location_from_json_ld(soup: BeautifulSoup) -> str:
-    for node in soup.find_all("script", attrs={"type": "application/ld+json"}):
-        raw = (node.string or node.get_text() or "").strip()
+def _json_ld_items(blocks: list[str]) -> list[dict]:
+    items = []
+    for raw in blocks:
+        raw = (raw or "").strip()
         if not raw:
             continue
         try:
             payload = json.loads(raw)
         except json.JSONDecodeError:
             continue
-
-        items = payload if isinstance(payload, list) else [payload]
-        for item in items:
+        for item in payload if isinstance(payload, list) else [payload]:
             if not isinstance(item, dict):
                 continue
-            job_location = item.get("jobLocation")
-            if isinstance(job_location, dict):
-                address = job_location.get("address", {})
-                locality = address.get("addressLocality") if isinstance(address, dict) else ""
-                region = address.get("addressRegion") if isinstance(address, dict) else ""
-                place = ", ".join([x for x in [locality, region] if x])
-                if place:
-                    return place[:80]
-            if isinstance(job_location, list):
-                for loc_item in job_location:
-                    if not isinstance(loc_item, dict):
-                        continue
-                    address = loc_item.get("address", {})
-                    locality = address.get("addressLocality") if isinstance(address, dict) else ""
-                    region = address.get("addressRegion") if isinstance(address, dict) else ""
-                    place = ", ".join([x for x in [locality, region] if x])
-                    if place:
-                        return place[:80]
+            items.append(item)
+            items.extend(node for node in item.get("@graph") or [] if isinstance(node, dict))
+    return items
+
+
+def _find_job_posting(items: list[dict]) -> dict | None:
+    """A schema.org JobPosting complete enough to skip the heading/bullet heuristics."""
+    for item in items:
+        types = item.get("@type")
+        types = types if isinstance(types, list) else [types]
+        if "JobPosting" not in types:
+            continue
+        if item.get("title") and item.get("description") and (item.get("jobLocation") or item.get("jobLocationType")):
+            return item
+    return None
+
+
+def _as_text_list(value) -> list[str]:
+    if not value:
+        return []
+    values = value if isinstance(value, list) else [value]
+    out = []
+    for item in values:
+        if isinstance(item, dict):
+            item = item.get("name") or item.get("description") or ""
+        if isinstance(item, str) and item.strip():
+            out.append(item)
+    return out
+
+
+def _posting_addresses(posting: dict) -> list[dict]:
+    locations = posting.get("jobLocation")
+    locations = locations if isinstance(locations, list) else [locations]
+    out = []
+    for location in locations:
+        address = location.get("address") if isinstance(location, dict) else None
+        if isinstance(address, dict):
+            out.append(address)
+    return out
+
+
+def _country_from_address(address: dict) -> str:
+    country = address.get("addressCountry") or ""
+    if isinstance(country, dict):
+        country = country.get("name") or ""
+    country = normalize_text(str(country))
+    return COUNTRY_NAMES.get(country.upper(), country)
+
+
+def _html_fragment_scan(fragment: str) -> _PageScan:
+    if "<" not in fragment and "&lt;" in fragment:
+        fragment = html.unescape(fragment)
+    return _PageScan(make_soup(fragment))
+
+
+def _posting_lines(posting: dict, keys: list[str]) -> list[str]:
+    """Bullets (or the whole text) of JobPosting properties that may hold HTML."""
+    lines = []
+    for key in keys:
+        for value in _as_text_list(posting.get(key)):
+            fragment = _html_fragment_scan(value)
+            lines.extend(fragment.bullets() or [fragment.full_text()])
+    return [line for line in lines if line]
+
+
+def _apply_job_posting(job: Job, posting: dict) -> bool:
+    """Fill job fields straight from a JobPosting. Returns whether a location was extracted."""
+    if not job.title:
+        job.title = normalize_text(str(posting.get("title", "")))
+    if posting.get("datePosted") and not job.posting_date:
+        job.posting_date = str(posting["datePosted"])[:10]
+    if posting.get("validThrough") and not job.end_date:
+        job.end_date = str(posting["validThrough"])[:10]
+    if not job.job_type:
+        for employment_type in _as_text_list(posting.get("employmentType")):
+            mapped = EMPLOYMENT_TYPES.get(employment_type.upper().replace("-", "_"))
+            if mapped:
+                job.job_type = interned(mapped)
+                break
+
+    if not job.base_country:
+        for address in _posting_addresses(posting):
+            country = _country_from_address(address)
+            if country:
+                job.base_country = interned(country)
+                break
+
+    location_extracted = False
+    if not job.base_city:
+        place = _extract_location_from_json_ld([posting])
+        if not place and str(posting.get("jobLocationType", "")).upper() == "TELECOMMUTE":
+            place = "Remote"
+        if place:
+            job.base_city = interned(place)
+            location_extracted = True
+
+    scan = _html_fragment_scan(str(posting.get("description", "")))
+    bullets = scan.bullets()
+    responsibility_lines, requirement_lines = _heading_sections(scan, [RESPONSIBILITY_HEADINGS, REQUIREMENT_HEADINGS])
+
+    responsibility_props = _posting_lines(posting, ["responsibilities"])
+    responsibility_lines = responsibility_props or responsibility_lines or bullets[:6]
+    if responsibility_lines:
+        job.responsibilities = _join_limited(_dedupe_lines(responsibility_lines), 1200)
+    else:
+        job.responsibilities = scan.full_text()[:800]
+
+    requirement_props = _posting_lines(posting, ["skills", "qualifications", "experienceRequirements", "educationRequirements"])
+    _apply_skills(job, (requirement_props + requirement_lines) or bullets or _to_lines(scan.full_text()))
+    return location_extracted
+
+
+def _apply_skills(job: Job, candidate_lines: list[str]) -> None:
+    hard_lines, soft_lines = _split_hard_soft(candidate_lines)
+
+    hard_lines = _dedupe_lines(hard_lines)
+    soft_lines = _dedupe_lines(_remove_overlap(soft_lines, hard_lines))
+
+    if hard_lines:
+        job.hard_skills = _join_limited(hard_lines, 800)
+    if soft_lines:
+        job.soft_skills = _join_limited(soft_lines, 800)
+
+
+def _extract_location_from_json_ld(items: list[dict]) -> str:
+    for item in items:
+        job_location = item.get("jobLocation")
+        locations = job_location if isinstance(job_location, list) else [job_location]
+        for loc_item in locations:
+            if not isinstance(loc_item, dict):
+                continue
+            address = loc_item.get("address", {})
+            locality = address.get("addressLocality") if isinstance(address, dict) else ""
+            region = address.get("addressRegion") if isinstance(address, dict) else ""
+            place = ", ".join([x for x in [locality, region] if x])
+            if place:
+                return place[:80]
     return ""
 
 
@@ -232,35 +466,50 @@ def _looks_like_non_job(title: str, text: str, bullets: list[str]) -> bool:
     return False
 
 
-def enrich_job_details(job: Job, session, source: dict | None = None) -> tuple[bool, bool, bool]:
+def enrich_job_details(job: Job, session, source: dict | None = None) -> tuple[bool, bool, bool, bool]:
+    """
+    Fetch job.url and fill detail fields in place.
+    Returns (fetched, is_job_page, location_extracted, used_json_ld_fast_path).
+    Raises BudgetExceeded when the time budget ran out before the page was fetched.
+    """
     if not job.url:
-        return False, False, False
+        return False, False, False, False
 
     try:
-        time.sleep(0.5)
         response = safe_get(session, job.url, timeout=20, retries=3)
+    except BudgetExceeded:
+        raise  # the caller keeps the job unenriched instead of dropping it
     except Exception as exc:
         logging.warning("Detail fetch failed for %s: %s", job.url, exc)
-        return False, False, False
+        return False, False, False, False
+
+    scan = _PageScan(make_soup(response.text))
+    full_text = scan.full_text()
+    json_ld_items = _json_ld_items(scan.json_ld)
 
-    soup = BeautifulSoup(response.text, "html.parser")
-    _clean_soup(soup)
+    # Fast path: a complete schema.org JobPosting already has everything we need.
+    posting = _find_job_posting(json_ld_items)
+    if posting is not None:
+        location_extracted = _apply_job_posting(job, posting)
+        emails = sorted(set(EMAIL_REGEX.findall(full_text)))
+        if emails:
+            job.contact = ";".join(emails)
+        return True, True, location_extracted, True
 
-    full_text = normalize_text(soup.get_text("\n", strip=True))
     all_lines = _to_lines(full_text)
-    all_bullets = _extract_all_bullets(soup)
+    all_bullets = scan.bullets()
 
     if _looks_like_non_job(job.title, full_text, all_bullets):
-        return True, False, False
+        return True, False, False, False
 
     location_hints = (source or {}).get("location_hints") or []
-    location = _extract_location_from_json_ld(soup) or _extract_location_from_text(all_lines, location_hints)
+    location = _extract_location_from_json_ld(json_ld_items) or _extract_location_from_text(all_lines, location_hints)
     location_extracted = False
     if location and not job.base_city:
-        job.base_city = location
+        job.base_city = interned(location)
         location_extracted = True
 
-    responsibility_lines = _heading_block_lines(soup, RESPONSIBILITY_HEADINGS)
+    responsibility_lines, requirement_lines = _heading_sections(scan, [RESPONSIBILITY_HEADINGS, REQUIREMENT_HEADINGS])
     if not responsibility_lines and all_bullets:
         responsibility_lines = all_bullets[:6]
 
@@ -269,20 +518,18 @@ def enrich_job_details(job: Job, session, source: dict | None = None) -> tuple[b
     elif all_lines:
         job.responsibilities = normalize_text(" ".join(all_lines))[:800]
 
-    requirement_lines = _heading_block_lines(soup, REQUIREMENT_HEADINGS)
-    candidate_lines = requirement_lines or all_bullets or all_lines
-    hard_lines, soft_lines = _split_hard_soft(candidate_lines)
-
-    hard_lines = _dedupe_lines(hard_lines)
-    soft_lines = _dedupe_lines(_remove_overlap(soft_lines, hard_lines))
-
-    if hard_lines:
-        job.hard_skills = _join_limited(hard_lines, 800)
-    if soft_lines:
-        job.soft_skills = _join_limited(soft_lines, 800)
+    _apply_skills(job, requirement_lines or all_bullets or all_lines)
 
     emails = sorted(set(EMAIL_REGEX.findall(full_text)))
     if emails:
         job.contact = ";".join(emails)
 
-    return True, True, location_extracted
+    return True, True, location_extracted, False
+
+
+def apply_enriched_fields(job: Job, stored: dict) -> None:
+    """Copy detail-page fields from a previously enriched job snapshot onto a fresh listing job."""
+    for field in ENRICHED_FIELDS:
+        value = stored.get(field)
+        if value and not (field in LISTING_FIELDS and getattr(job, field)):
+            setattr(job, field, interned(value) if field in INTERNED_FIELDS else value)
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_CACHE_DIR = "data/http_cache"
+INDEX_FILE = "index.json"
+STORED_HEADERS = ["Content-Type", "ETag", "Last-Modified"]
+
+
+class HttpCache:
+    """
+    Persistent cache of GET responses that carry ETag / Last-Modified validators.
+    Bodies live in one file per URL; index.json keeps validators and timestamps.
+    Entries older than max_age_days are refetched in full, and the least recently
+    used entries are evicted once the bodies exceed max_size_mb.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_DIR, max_size_mb: float = 200, max_age_days: float = 14):
+        self.path = path
+        self.max_size_bytes = int(float(max_size_mb) * 1024 * 1024)
+        self.max_age_seconds = float(max_age_days) * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index: dict[str, dict] = {}
+        self._load()
+
+    def _index_path(self) -> str:
+        return os.path.join(self.path, INDEX_FILE)
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.path, key + ".body")
+
+    def _load(self) -> None:
+        if not os.path.exists(self._index_path()):
+            return
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                self._index = json.load(f)
+        except (OSError, json.JSONDecodeError) as exc:
+            logging.warning("HTTP cache index unreadable, starting empty: %s", exc)
+            self._index = {}
+
+    def _is_expired(self, entry: dict, now: float) -> bool:
+        return now - entry.get("stored_at", 0) > self.max_age_seconds
+
+    def conditional_headers(self, url: str) -> dict:
+        with self._lock:
+            entry = self._index.get(url)
+            if not entry or self._is_expired(entry, time.time()):
+                return {}
+            headers = {}
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+            return headers
+
+    def cached_response(self, url: str, not_modified: requests.Response) -> requests.Response | None:
+        """Turn a 304 into the stored 200 response, or None if the body is gone."""
+        with self._lock:
+            entry = self._index.get(url)
+            if not entry:
+                return None
+            try:
+                with open(self._body_path(entry["key"]), "rb") as f:
+                    body = f.read()
+            except OSError:
+                self._index.pop(url, None)
+                return None
+            entry["used_at"] = time.time()
+            self.hits += 1
+
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.reason = "OK"
+        resp._content = body
+        resp.headers = CaseInsensitiveDict(entry.get("headers") or {})
+        resp.encoding = entry.get("encoding")
+        resp.url = url
+        resp.request = not_modified.request
+        resp.from_cache = True
+        return resp
+
+    def store(self, url: str, resp: requests.Response) -> None:
+        with self._lock:
+            self.misses += 1
+        etag = resp.headers.get("ETag", "")
+        last_modified = resp.headers.get("Last-Modified", "")
+        if resp.status_code != 200 or not (etag or last_modified):
+            return
+
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._body_path(key), "wb") as f:
+            f.write(resp.content)
+
+        now = time.time()
+        with self._lock:
+            self._index[url] = {
+                "key": key,
+                "etag": etag,
+                "last_modified": last_modified,
+                "encoding": resp.encoding,
+                "headers": {name: resp.headers[name] for name in STORED_HEADERS if name in resp.headers},
+                "size": len(resp.content),
+                "stored_at": now,
+                "used_at": now,
+            }
+
+    def _evict(self) -> None:
+        now = time.time()
+        for url, entry in list(self._index.items()):
+            if self._is_expired(entry, now):
+                self._drop(url)
+
+        total = sum(entry.get("size", 0) for entry in self._index.values())
+        if total <= self.max_size_bytes:
+            return
+        for url, entry in sorted(self._index.items(), key=lambda item: item[1].get("used_at", 0)):
+            if total <= self.max_size_bytes:
+                break
+            total -= entry.get("size", 0)
+            self._drop(url)
+
+    def _drop(self, url: str) -> None:
+        entry = self._index.pop(url, None)
+        if not entry:
+            return
+        try:
+            os.remove(self._body_path(entry["key"]))
+        except OSError:
+            pass
+
+    def save(self) -> None:
+        with self._lock:
+            self._evict()
+            os.makedirs(self.path, exist_ok=True)
+            tmp_path = self._index_path() + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f, ensure_ascii=False)
+            os.replace(tmp_path, self._index_path())
+        logging.info("HTTP cache saved: entries=%s hits=%s misses=%s", len(self._index), self.hits, self.misses)
+
+
+def cache_from_settings(settings: dict) -> HttpCache | None:
+    cfg = settings.get("http_cache") or {}
+    if not cfg.get("enabled", False):
+        return None
+    return HttpCache(
+        path=cfg.get("path", DEFAULT_CACHE_DIR),
+        max_size_mb=cfg.get("max_size_mb", 200),
+        max_age_days=cfg.get("max_age_days", 14),
+    )
@@ -1,26 +1,86 @@
+import argparse
+import hashlib
+import json
 import logging
 import os
-from typing import Callable
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Callable, Iterable
 
-import requests
 import yaml
 
-from detail_fetcher import enrich_job_details
+from budget import BudgetExceeded, Deadline, deadline_scope
+from detail_fetcher import apply_enriched_fields, enrich_job_details
+from http_cache import cache_from_settings
+from metrics import METRICS, log_run_summary, write_run_report
 from models import Job
-from parsers import bamboohr, generic, mbw, musicweek, workday
-from state import load_state, save_state
+from output_writer import JobOutputWriter, available_formats
+from parsers import bamboohr, generic, mbw, musicweek, sitemap, workday
+from profiling import PROFILE_DIR, SourceProfiler
+from replay import DEFAULT_ARCHIVE_PATH, ArchiveReplay, HttpRecorder, ServerReplay
+from retry_policy import load_source_health, retry_policy_from_settings, source_due, update_source_health
+from schedule import load_source_schedule, next_due, schedule_due, update_source_schedule
+from state import (
+    JsonStateStore,
+    job_record_is_fresh,
+    load_listing_checked_at,
+    load_listing_snapshot,
+    load_listing_urls,
+    make_job_record,
+    open_state,
+    save_listing_checked_at,
+    save_listing_snapshot,
+    save_listing_urls,
+)
+from throttle import DETAIL_THROTTLE, map_by_host, set_inline
 from utils import (
     assess_seniority_relevance,
-    dedupe_by_url,
+    canonical_url,
+    close_thread_sessions,
+    dedupe_candidates,
     is_job_candidate_allowed,
     job_matches_keywords,
+    set_html_parser,
+    set_http_cache,
+    set_http_recording,
+    set_retry_policy,
     setup_logging,
-    write_jobs_csv,
+    thread_session,
 )
 
 CONFIG_PATH = "config/sources.yaml"
 OUTPUT_LATEST = "output/jobs_latest.csv"
 OUTPUT_NEW = "output/jobs_new.csv"
+DEFAULT_WORKERS = 1
+DEFAULT_DETAIL_REFRESH_DAYS = 7
+DEFAULT_LISTING_MAX_STALENESS_HOURS = 168
+# daemon mode: how often to look for due sources when none is due sooner, and the longest single sleep
+DEFAULT_IDLE_CHECK_SECONDS = 60
+DAEMON_MAX_SLEEP_SECONDS = 900
+# keyword arguments parsers take besides (source, session): known_url lets paginating
+# parsers stop early, since (start of the last complete listing run) skips unchanged entries
+PARSER_KWARGS = {
+    "generic": ("known_url",),
+    "mbw": ("known_url",),
+    "musicweek": ("known_url",),
+    "workday": ("known_url",),
+    "sitemap": ("known_url", "since"),
+}
+# per-source result counters copied into the run report
+REPORTED_COUNTS = [
+    "fetched_candidates",
+    "dropped_as_duplicate",
+    "dropped_as_non_job",
+    "dropped_as_too_senior",
+    "details_fetched_count",
+    "details_reused_count",
+    "details_skipped_count",
+    "json_ld_fast_path_count",
+    "location_extracted_count",
+]
 
 
 def parse_page_only(source: dict, _session) -> list[Job]:
@@ -51,14 +111,22 @@ PARSER_MAP: dict[str, Callable] = {
     "mbw": mbw.parse_source,
     "musicweek": musicweek.parse_source,
     "workday": workday.parse_source,
+    "sitemap": sitemap.parse_source,
     "page_only": parse_page_only,
 }
 
 
-def load_sources(path: str = CONFIG_PATH) -> list[dict]:
+def load_config(path: str = CONFIG_PATH) -> dict:
     with open(path, "r", encoding="utf-8") as f:
-        cfg = yaml.safe_load(f) or {}
-    return cfg.get("sources", [])
+        return yaml.safe_load(f) or {}
+
+
+def load_sources(path: str = CONFIG_PATH) -> list[dict]:
+    return load_config(path).get("sources", [])
+
+
+def load_settings(path: str = CONFIG_PATH) -> dict:
+    return load_config(path).get("settings") or {}
 
 
 def should_fetch_details(source: dict, parser_type: str) -> bool:
@@ -67,47 +135,106 @@ def should_fetch_details(source: dict, parser_type: str) -> bool:
     return source.get("fetch_detail", True) is not False
 
 
-def run() -> None:
-    setup_logging()
-    os.makedirs("output", exist_ok=True)
-    os.makedirs("data", exist_ok=True)
+def source_deadline(source: dict, run_deadline: Deadline | None = None, default_seconds: float | None = None) -> Deadline:
+    """Deadline for one source, starting now: its time_budget_seconds, capped by the run's deadline."""
+    seconds = source.get("time_budget_seconds", default_seconds)
+    return Deadline(float(seconds) if seconds is not None else None, run_deadline)
 
-    state = load_state()
-    seen_urls = state["seen_urls"]
-    seen_fingerprints = state["seen_fingerprints"]
 
-    sources = load_sources()
-    all_jobs: list[Job] = []
-    new_jobs: list[Job] = []
+def known_url_check(source: dict, state) -> Callable[[str], bool] | None:
+    """
+    Predicate for paginating parsers: a URL is known if it was kept before or the
+    source's listing returned it last time. None when the source opts out
+    (stop_on_known: false) or there is no state.
+    """
+    if state is None or source.get("stop_on_known", True) is False:
+        return None
+    listed = load_listing_urls(state, source.get("id", "unknown"))
 
-    with requests.Session() as session:
-        for source in sources:
-            source_id = source.get("id", "unknown")
-            parser_type = source.get("parser_type", "page_only")
-            parser = PARSER_MAP.get(parser_type)
-            if not parser:
-                logging.warning("Unknown parser_type=%s for source=%s. Skipping.", parser_type, source_id)
-                continue
+    def known(url: str) -> bool:
+        url = canonical_url(url)
+        return url in listed or state.has_url(url)
+
+    return known
+
+
+def listing_digest(source: dict, jobs: list[Job]) -> str:
+    """
+    Digest of a source's parsed listing plus its config. Hashing the parsed candidates
+    rather than the HTML ignores volatile markup (session tokens, ads, timestamps).
+    """
+    payload = json.dumps([source, [job.to_csv_tuple() for job in jobs]], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
-            try:
-                parsed_jobs = parser(source, session)
-            except Exception as exc:
-                logging.warning("Source failed: %s (%s)", source_id, exc)
-                parsed_jobs = []
 
-            fetched_candidates = len(parsed_jobs)
-            dropped_as_non_job = 0
-            dropped_as_too_senior = 0
-            details_fetched_count = 0
-            location_extracted_count = 0
+def collect_source(
+    source: dict,
+    session,
+    deadline: Deadline | None = None,
+    known_url: Callable[[str], bool] | None = None,
+    since: datetime | None = None,
+    snapshot: dict | None = None,
+    reuse_unchanged: bool = True,
+) -> dict | None:
+    """
+    Listing stage for one source: fetch, dedupe candidates and apply the filters.
+    Safe to run in a worker thread. `deadline` also bounds the later detail stage;
+    `known_url` and `since` are handed to the parsers that take them (PARSER_KWARGS).
+    With reuse_unchanged, a listing that matches `snapshot` (see load_listing_snapshot)
+    reuses its kept jobs instead of filtering again, and the detail stage is skipped.
+    When the parser stopped early or read the listing only in part, the snapshot's
+    jobs it did not re-read are carried over as they are (carried_jobs), so they
+    stay in jobs_latest without a detail fetch.
+    """
+    source_id = source.get("id", "unknown")
+    parser_type = source.get("parser_type", "page_only")
+    parser = PARSER_MAP.get(parser_type)
+    if not parser:
+        logging.warning("Unknown parser_type=%s for source=%s. Skipping.", parser_type, source_id)
+        return None
 
+    with METRICS.scope(source_id, "listing"), deadline_scope(deadline):
+        listing_failed = False
+        listing_timed_out = False
+        try:
+            context = {"known_url": known_url, "since": since}
+            kwargs = {name: context[name] for name in PARSER_KWARGS.get(parser_type, ())}
+            parsed_jobs = parser(source, session, **kwargs)
+        except BudgetExceeded as exc:
+            logging.warning("Source out of time: %s (%s)", source_id, exc)
+            parsed_jobs = []
+            listing_timed_out = True
+        except Exception as exc:
+            logging.warning("Source failed: %s (%s)", source_id, exc)
+            parsed_jobs = []
+            listing_failed = True
+
+    with METRICS.scope(source_id, "filter"):
+        # a partial read (see models.Listing) is kept but not remembered as the source's listing
+        listing_incomplete = not getattr(parsed_jobs, "complete", True)
+        listing_stopped_early = getattr(parsed_jobs, "stopped_early", False)
+        fetched_candidates = len(parsed_jobs)
+        parsed_jobs = dedupe_candidates(parsed_jobs)
+        listing_urls = {canonical_url(job.url) for job in parsed_jobs if job.url}
+        digest = listing_digest(source, parsed_jobs)
+        listing_read = not listing_failed and not listing_timed_out and not listing_incomplete
+        listing_unchanged = (
+            reuse_unchanged and listing_read and snapshot is not None and snapshot.get("digest") == digest
+        )
+        dropped_as_duplicate = fetched_candidates - len(parsed_jobs)
+        dropped_as_non_job = 0
+        dropped_as_too_senior = 0
+
+        kept_jobs: list[Job] = []
+        if listing_unchanged:
+            kept_jobs = [Job(**fields) for fields in snapshot["jobs"]]
+        else:
             filtered_by_patterns = [job for job in parsed_jobs if is_job_candidate_allowed(job, source)]
-            dropped_as_non_job += fetched_candidates - len(filtered_by_patterns)
+            dropped_as_non_job += len(parsed_jobs) - len(filtered_by_patterns)
 
             keyword_jobs = [job for job in filtered_by_patterns if job_matches_keywords(job, parser_type)]
             dropped_as_non_job += len(filtered_by_patterns) - len(keyword_jobs)
 
-            kept_jobs: list[Job] = []
             for job in keyword_jobs:
                 keep, reason = assess_seniority_relevance(job, source)
                 if keep:
@@ -117,66 +244,702 @@ def run() -> None:
                 else:
                     dropped_as_non_job += 1
 
-            if should_fetch_details(source, parser_type):
-                detail_kept = []
-                for job in kept_jobs:
-                    if not job.url:
-                        detail_kept.append(job)
-                        continue
-                    fetched, is_job_page, location_extracted = enrich_job_details(job, session, source)
-                    if fetched:
-                        details_fetched_count += 1
-                    if location_extracted:
-                        location_extracted_count += 1
-                    if is_job_page:
-                        detail_kept.append(job)
-                    else:
-                        dropped_as_non_job += 1
-                kept_jobs = detail_kept
+        carried_jobs: list[Job] = []
+        partial = listing_stopped_early or listing_incomplete
+        if partial and not listing_failed and not listing_timed_out and snapshot is not None:
+            carried_jobs = [
+                Job(**fields)
+                for fields in snapshot["jobs"]
+                if fields.get("url") and canonical_url(fields["url"]) not in listing_urls
+            ]
 
-            # listing-level extracted location counts too
-            location_extracted_count += sum(1 for job in kept_jobs if job.base_city)
-            kept_after_filter = len(kept_jobs)
+    return {
+        "source": source,
+        "source_id": source_id,
+        "parser_type": parser_type,
+        "listing_failed": listing_failed,
+        "listing_timed_out": listing_timed_out,
+        "listing_incomplete": listing_incomplete,
+        "listing_stopped_early": listing_stopped_early,
+        "listing_unchanged": listing_unchanged,
+        "listing_digest": digest,
+        "truncated": listing_timed_out,
+        "deadline": deadline,
+        "kept_jobs": kept_jobs,
+        "carried_jobs": carried_jobs,
+        "snapshot_taken_at": snapshot["taken_at"] if snapshot is not None else None,
+        "listing_urls": listing_urls,
+        "fetched_candidates": fetched_candidates,
+        "dropped_as_duplicate": dropped_as_duplicate,
+        "dropped_as_non_job": dropped_as_non_job,
+        "dropped_as_too_senior": dropped_as_too_senior,
+        "details_fetched_count": 0,
+        "details_reused_count": 0,
+        "details_skipped_count": 0,
+        "json_ld_fast_path_count": 0,
+        "location_extracted_count": 0,
+        "job_records": {},
+    }
 
-            source_new = []
+
+def claim_urls(result: dict, claimed: set[str]) -> None:
+    """
+    Drop kept jobs whose URL an earlier source already kept, so every posting is
+    enriched once per run. Runs on the main thread in config order, which keeps the
+    winner deterministic. Done after filtering, since one source's filters may
+    reject a posting another source keeps.
+    """
+    for key in ("kept_jobs", "carried_jobs"):
+        unclaimed = []
+        for job in result[key]:
+            url = canonical_url(job.url)
+            if url and url in claimed:
+                result["dropped_as_duplicate"] += 1
+                continue
+            if url:
+                claimed.add(url)
+            unclaimed.append(job)
+        result[key] = unclaimed
+
+
+def enrich_source(result: dict, state=None, refresh_days: float | None = None) -> dict:
+    """
+    Detail stage for one source. Safe to run in a worker thread.
+    With refresh_days set (incremental mode), URLs whose job record in `state` is
+    younger than refresh_days reuse it instead of fetching the detail page again.
+    Once the source's deadline passes, the remaining jobs are kept without details
+    and the result is marked truncated. Jobs reused from an unchanged listing, and
+    carried-over jobs, are already enriched and skip this stage.
+    """
+    source = result["source"]
+    source_id = result["source_id"]
+    kept_jobs = result["kept_jobs"]
+    deadline = result.get("deadline")
+
+    def enrich_page(job: Job):
+        with METRICS.scope(source_id, "detail_page"), deadline_scope(deadline):
+            try:
+                return enrich_job_details(job, thread_session(), source)
+            except BudgetExceeded:
+                return None
+
+    if should_fetch_details(source, result["parser_type"]) and not result["listing_unchanged"]:
+        with METRICS.scope(source_id, "detail"):
+            reused: dict[int, bool] = {}
+            detail_jobs = []
             for job in kept_jobs:
-                key_url = job.url.strip()
-                key_fp = job.fingerprint()
-                is_new = False
-
-                if key_url and key_url not in seen_urls:
-                    seen_urls.add(key_url)
-                    is_new = True
-                elif key_fp and key_fp not in seen_fingerprints:
-                    seen_fingerprints.add(key_fp)
-                    if not key_url:
-                        is_new = True
-
-                if is_new:
-                    source_new.append(job)
-
-            all_jobs.extend(kept_jobs)
-            new_jobs.extend(source_new)
-            logging.info(
-                "source=%s fetched_candidates=%s kept_after_filter=%s dropped_as_non_job=%s dropped_as_too_senior=%s details_fetched_count=%s location_extracted_count=%s new_count=%s",
-                source_id,
-                fetched_candidates,
-                kept_after_filter,
-                dropped_as_non_job,
-                dropped_as_too_senior,
-                details_fetched_count,
-                location_extracted_count,
-                len(source_new),
+                if not job.url:
+                    continue
+                record = None
+                if state is not None and refresh_days is not None:
+                    record = state.get_job_record(canonical_url(job.url))
+                if job_record_is_fresh(record, refresh_days or 0):
+                    apply_enriched_fields(job, record["job"])
+                    reused[id(job)] = bool(record.get("is_job_page"))
+                else:
+                    detail_jobs.append(job)
+
+            detail_results = map_by_host(
+                detail_jobs, lambda job: job.url, enrich_page, source, deadline=deadline
             )
+            outcomes = dict(zip(map(id, detail_jobs), detail_results))
+            for job, outcome in zip(detail_jobs, detail_results):
+                if outcome is not None and outcome[0]:
+                    result["job_records"][canonical_url(job.url)] = make_job_record(job, outcome[1])
+
+            detail_kept = []
+            for job in kept_jobs:
+                if not job.url:
+                    detail_kept.append(job)
+                    continue
+                if id(job) in reused:
+                    result["details_reused_count"] += 1
+                    if reused[id(job)]:
+                        detail_kept.append(job)
+                    else:
+                        result["dropped_as_non_job"] += 1
+                    continue
+                if outcomes[id(job)] is None:
+                    # out of time: keep the listing data rather than lose the job
+                    result["details_skipped_count"] += 1
+                    result["truncated"] = True
+                    detail_kept.append(job)
+                    continue
+                fetched, is_job_page, location_extracted, used_json_ld = outcomes[id(job)]
+                if fetched:
+                    result["details_fetched_count"] += 1
+                if used_json_ld:
+                    result["json_ld_fast_path_count"] += 1
+                if location_extracted:
+                    result["location_extracted_count"] += 1
+                if is_job_page:
+                    detail_kept.append(job)
+                else:
+                    result["dropped_as_non_job"] += 1
+            kept_jobs = detail_kept
+
+    # listing-level extracted location counts too
+    result["location_extracted_count"] += sum(1 for job in kept_jobs if job.base_city)
+    result["kept_jobs"] = kept_jobs + result["carried_jobs"]
+    return result
+
+
+def merge_new_jobs(kept_jobs: list[Job], state) -> list[Job]:
+    """Update seen state and return the jobs not seen before. Must run in source order."""
+    source_new = []
+    for job in kept_jobs:
+        key_url = canonical_url(job.url)
+        key_fp = job.fingerprint()
+        is_new = False
+
+        if key_url and not state.has_url(key_url):
+            is_new = True
+        elif key_fp and not state.has_fingerprint(key_fp):
+            state.add_fingerprint(key_fp)
+            if not key_url:
+                is_new = True
+        if key_url:
+            # refreshes last_seen for URLs we already knew
+            state.add_url(key_url)
+
+        if is_new:
+            source_new.append(job)
+    return source_new
+
+
+def select_due_sources(sources: list[dict], state) -> tuple[list[dict], list[str]]:
+    """Split off sources that failed several runs in a row and are not due for a probe yet."""
+    due, skipped = [], []
+    for source in sources:
+        source_id = source.get("id", "unknown")
+        health = load_source_health(state, source_id)
+        if source_due(health):
+            due.append(source)
+            continue
+        skipped.append(source_id)
+        logging.info(
+            "source=%s skipped: failed %s runs in a row, next probe after %s",
+            source_id,
+            health.get("consecutive_failures"),
+            health.get("next_probe"),
+        )
+    return due, skipped
+
+
+def iter_source_results(
+    sources: list[dict],
+    workers: int,
+    state=None,
+    refresh_days: float | None = None,
+    profiler: SourceProfiler | None = None,
+    run_deadline: Deadline | None = None,
+    source_budget_seconds: float | None = None,
+    max_staleness_hours: float | None = None,
+    force_refresh: bool = False,
+) -> Iterable[dict | None]:
+    """
+    Yield per-source results in config order, crawling up to `workers` sources at once.
+    A source's detail stage starts as soon as its listing and every earlier listing are
+    in, because cross-source URL claims have to be made in config order.
+    A profiler needs workers=1: each source is then profiled from listing to details.
+    Parsers may stop early on known postings only while the source's snapshot is at
+    most max_staleness_hours old (the source's max_staleness_hours, or the default);
+    with max_staleness_hours set, an unchanged listing also reuses the snapshot's jobs.
+    force_refresh ignores everything remembered about earlier listings.
+    """
+    claimed: set[str] = set()
+    remembered = state is not None and not force_refresh
 
-    all_jobs = dedupe_by_url(all_jobs)
-    new_jobs = dedupe_by_url(new_jobs)
+    def collect(source: dict) -> dict | None:
+        source_id = source.get("id", "unknown")
+        snapshot = None
+        if remembered:
+            default_hours = max_staleness_hours if max_staleness_hours is not None else DEFAULT_LISTING_MAX_STALENESS_HOURS
+            max_age_hours = float(source.get("max_staleness_hours", default_hours))
+            snapshot = load_listing_snapshot(state, source_id, max_age_hours)
+        # stopping early leaves out postings only the snapshot still holds, so without
+        # one (first run, or the last full read is too old) the listing is read in full
+        early_stop = snapshot is not None
+        return collect_source(
+            source,
+            thread_session(),
+            source_deadline(source, run_deadline, source_budget_seconds),
+            known_url_check(source, state) if early_stop else None,
+            load_listing_checked_at(state, source_id) if early_stop else None,
+            snapshot,
+            reuse_unchanged=max_staleness_hours is not None,
+        )
+
+    def enrich(result: dict | None) -> dict | None:
+        return enrich_source(result, state, refresh_days) if result is not None else None
+
+    if workers <= 1:
+        for source in sources:
+            with profiler.profile(source.get("id", "unknown")) if profiler else nullcontext():
+                result = collect(source)
+                if result is not None:
+                    claim_urls(result, claimed)
+                result = enrich(result)
+            yield result
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="listing") as listing_pool, ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="source"
+    ) as detail_pool:
+        listing_futures = [listing_pool.submit(collect, source) for source in sources]
+        detail_futures = []
+        for future in listing_futures:
+            result = future.result()
+            if result is not None:
+                claim_urls(result, claimed)
+            detail_futures.append(detail_pool.submit(enrich, result))
+        for future in detail_futures:
+            yield future.result()
+
+
+def setup_http(settings: dict, recorder: HttpRecorder | None = None, replay=None):
+    """Configure parsing and HTTP for a run; returns the HTTP cache (None when replaying or disabled)."""
+    set_html_parser(settings.get("html_parser", "html.parser"))
+    set_http_recording(recorder, replay)
+    # replayed responses are already local: no conditional requests, no politeness delays
+    http_cache = cache_from_settings(settings) if replay is None else None
+    set_http_cache(http_cache)
+    DETAIL_THROTTLE.enabled = replay is None
+    set_retry_policy(retry_policy_from_settings(settings))
+    return http_cache
+
+
+def crawl_sources(
+    sources: list[dict],
+    state,
+    settings: dict,
+    workers: int,
+    started_at: datetime,
+    on_result: Callable[[dict, list[Job]], None],
+    profiler: SourceProfiler | None = None,
+    replay: bool = False,
+    force_refresh: bool = False,
+) -> int:
+    """
+    Crawl `sources` once: update the state and run metrics per source, and hand each
+    result with its new jobs to on_result, in config order. Returns how many jobs
+    took the JSON-LD fast path.
+    """
+    run_budget = settings.get("run_budget_seconds")
+    run_deadline = Deadline(float(run_budget) if run_budget else None)
+    source_budget = settings.get("source_time_budget_seconds")
+    source_budget = float(source_budget) if source_budget else None
+    refresh_days = None
+    max_staleness_hours = None
+    if settings.get("incremental", False) and not force_refresh:
+        refresh_days = float(settings.get("detail_refresh_days", DEFAULT_DETAIL_REFRESH_DAYS))
+        max_staleness_hours = float(settings.get("listing_max_staleness_hours", DEFAULT_LISTING_MAX_STALENESS_HOURS))
+    json_ld_fast_path_total = 0
+
+    results = iter_source_results(
+        sources,
+        workers,
+        state,
+        refresh_days,
+        profiler,
+        run_deadline,
+        source_budget,
+        max_staleness_hours,
+        force_refresh,
+    )
+    for result in results:
+        if result is None:
+            continue
+        for url, record in result["job_records"].items():
+            state.put_job_record(url, record)
+        kept_jobs = result["kept_jobs"]
+        json_ld_fast_path_total += result["json_ld_fast_path_count"]
+        source_new = merge_new_jobs(kept_jobs, state)
+        if not result["listing_failed"] and not result["listing_timed_out"]:
+            save_listing_urls(state, result["source_id"], result["listing_urls"])
+            if not result["listing_incomplete"]:
+                save_listing_checked_at(state, result["source_id"], started_at)
+                if not result["listing_unchanged"] and not result["truncated"]:
+                    # carried-over jobs were last read in full when the snapshot was taken,
+                    # so the snapshot keeps that age and a full read still comes due
+                    taken_at = result["snapshot_taken_at"] if result["listing_stopped_early"] else None
+                    save_listing_snapshot(
+                        state, result["source_id"], result["listing_digest"], kept_jobs, taken_at
+                    )
+        if not replay and not result["listing_timed_out"]:
+            health = update_source_health(state, result["source_id"], not result["listing_failed"], settings)
+            if health.get("next_probe"):
+                logging.warning(
+                    "source=%s failed %s runs in a row; next probe after %s",
+                    result["source_id"],
+                    health["consecutive_failures"],
+                    health["next_probe"],
+                )
+
+        on_result(result, source_new)
+        METRICS.set_counts(
+            result["source_id"],
+            {key: result[key] for key in REPORTED_COUNTS}
+            | {
+                "kept": len(kept_jobs),
+                "new": len(source_new),
+                "truncated": result["truncated"],
+                "listing_unchanged": result["listing_unchanged"],
+                "listing_incomplete": result["listing_incomplete"],
+            },
+        )
+        logging.info(
+            "source=%s fetched_candidates=%s kept_after_filter=%s dropped_as_duplicate=%s dropped_as_non_job=%s dropped_as_too_senior=%s details_fetched_count=%s details_reused_count=%s details_skipped_count=%s json_ld_fast_path_count=%s location_extracted_count=%s new_count=%s truncated=%s listing_unchanged=%s",
+            result["source_id"],
+            result["fetched_candidates"],
+            len(kept_jobs),
+            result["dropped_as_duplicate"],
+            result["dropped_as_non_job"],
+            result["dropped_as_too_senior"],
+            result["details_fetched_count"],
+            result["details_reused_count"],
+            result["details_skipped_count"],
+            result["json_ld_fast_path_count"],
+            result["location_extracted_count"],
+            len(source_new),
+            result["truncated"],
+            result["listing_unchanged"],
+        )
+    return json_ld_fast_path_total
 
-    write_jobs_csv(OUTPUT_LATEST, all_jobs)
-    write_jobs_csv(OUTPUT_NEW, new_jobs)
-    save_state(seen_urls, seen_fingerprints)
-    logging.info("Done. latest=%s new=%s", len(all_jobs), len(new_jobs))
+
+def prune_state(state, settings: dict) -> None:
+    ttl_days = (settings.get("state") or {}).get("ttl_days")
+    if ttl_days:
+        pruned = state.prune(float(ttl_days))
+        logging.info("State pruned: removed=%s entries older than %s days", pruned, ttl_days)
+
+
+def run(
+    workers: int | None = None,
+    record_path: str | None = None,
+    replay_path: str | None = None,
+    replay_server: str | None = None,
+    profile_dir: str | None = None,
+    profile_sources: list[str] | None = None,
+    force_refresh: bool = False,
+) -> None:
+    setup_logging()
+    METRICS.reset()
+    started_at = datetime.now(timezone.utc)
+    os.makedirs("output", exist_ok=True)
+    os.makedirs("data", exist_ok=True)
+
+    settings = load_settings()
+    sources = load_sources()
+    if workers is None:
+        workers = int(settings.get("workers", DEFAULT_WORKERS))
+    profiler = None
+    if profile_dir:
+        # cProfile only sees the calling thread, so profiled runs are fully serial
+        profiler = SourceProfiler(profile_dir, profile_sources)
+        workers = 1
+        set_inline(True)
+    recorder = HttpRecorder(record_path) if record_path else None
+    replay = None
+    if replay_server:
+        replay = ServerReplay(replay_server)
+    elif replay_path:
+        replay = ArchiveReplay(replay_path)
+    http_cache = setup_http(settings, recorder, replay)
+    # replays must be reproducible: they start from an empty in-memory state that is
+    # never saved, crawl every source and leave health alone
+    state = open_state(settings) if replay is None else JsonStateStore(None)
+    skipped_sources: list[str] = []
+    if replay is None:
+        sources, skipped_sources = select_due_sources(sources, state)
+
+    # rows are streamed to .tmp files and only replace the previous outputs once the run completes
+    export_formats = available_formats(settings.get("export_formats") or ["csv"])
+    latest_out = JobOutputWriter(OUTPUT_LATEST, export_formats)
+    new_out = JobOutputWriter(OUTPUT_NEW, export_formats)
+
+    def write_result(result: dict, source_new: list[Job]) -> None:
+        latest_out.write_many(result["kept_jobs"])
+        new_out.write_many(source_new)
+
+    try:
+        json_ld_fast_path_total = crawl_sources(
+            sources,
+            state,
+            settings,
+            workers,
+            started_at,
+            write_result,
+            profiler=profiler,
+            replay=replay is not None,
+            # a recording must hold every page, since replays start from an empty state
+            force_refresh=force_refresh or recorder is not None,
+        )
+    except BaseException:
+        latest_out.abort()
+        new_out.abort()
+        raise
+    finally:
+        close_thread_sessions()
+        if http_cache is not None:
+            http_cache.save()
+        if recorder is not None:
+            recorder.save()
+        if profiler is not None:
+            set_inline(False)
+            profiler.save()
+
+    latest_out.commit()
+    new_out.commit()
+    prune_state(state, settings)
+    state.save()
+    state.close()
+    report = METRICS.report(
+        workers=workers,
+        replay=replay is not None,
+        latest=latest_out.count,
+        new=new_out.count,
+        skipped_sources=skipped_sources,
+    )
+    write_run_report(report)
+    log_run_summary(report)
+    logging.info(
+        "Done. latest=%s new=%s json_ld_fast_path=%s", latest_out.count, new_out.count, json_ld_fast_path_total
+    )
+
+
+def daemon_cycle(
+    sources: list[dict],
+    due: list[dict],
+    state,
+    settings: dict,
+    workers: int,
+    kept_by_source: dict[str, list[Job]],
+    skipped_sources: list[str],
+) -> None:
+    """
+    Crawl the due sources, reschedule them, and rewrite the outputs: jobs_latest with
+    every source's most recent kept jobs (from this daemon's earlier cycles, else
+    from its last saved listing snapshot), jobs_new with this cycle's new jobs.
+    """
+    METRICS.reset()
+    started_at = datetime.now(timezone.utc)
+    new_jobs: list[Job] = []
+    for source in sources:
+        source_id = source.get("id", "unknown")
+        if source_id not in kept_by_source:
+            # read before crawling, since crawling saves the new snapshots
+            snapshot = load_listing_snapshot(state, source_id, float("inf"))
+            kept_by_source[source_id] = [Job(**fields) for fields in snapshot["jobs"]] if snapshot else []
+
+    def record_result(result: dict, source_new: list[Job]) -> None:
+        source_id = result["source_id"]
+        ok = not result["listing_failed"] and not result["listing_timed_out"]
+        schedule = update_source_schedule(state, result["source"], len(source_new), ok, settings)
+        new_jobs.extend(source_new)
+        logging.info(
+            "source=%s next poll %s (every %sh, %s new/h)",
+            source_id,
+            schedule["next_due"],
+            schedule["interval_hours"],
+            schedule.get("new_per_hour", "-"),
+        )
+        if not ok:
+            return  # jobs_latest keeps the source's earlier jobs
+        # postings a partial read left out are already carried over (see collect_source)
+        kept_by_source[source_id] = result["kept_jobs"]
+
+    try:
+        json_ld_fast_path_total = crawl_sources(due, state, settings, workers, started_at, record_result)
+    finally:
+        # pool threads end with the cycle, and idle keep-alive connections would not outlive the wait anyway
+        close_thread_sessions()
+
+    export_formats = available_formats(settings.get("export_formats") or ["csv"])
+    latest_out = JobOutputWriter(OUTPUT_LATEST, export_formats)
+    new_out = JobOutputWriter(OUTPUT_NEW, export_formats)
+    with latest_out, new_out:
+        for source in sources:
+            latest_out.write_many(kept_by_source[source.get("id", "unknown")])
+        new_out.write_many(new_jobs)
+
+    prune_state(state, settings)
+    state.save()
+    report = METRICS.report(
+        workers=workers,
+        daemon=True,
+        polled_sources=[source.get("id", "unknown") for source in due],
+        latest=latest_out.count,
+        new=new_out.count,
+        skipped_sources=skipped_sources,
+    )
+    write_run_report(report)
+    log_run_summary(report)
+    logging.info(
+        "Cycle done. polled=%s latest=%s new=%s json_ld_fast_path=%s",
+        len(due),
+        latest_out.count,
+        new_out.count,
+        json_ld_fast_path_total,
+    )
+
+
+def seconds_until_next_poll(sources: list[dict], state, settings: dict) -> float:
+    """Time to the earliest scheduled poll, at least idle_check_seconds and at most DAEMON_MAX_SLEEP_SECONDS."""
+    cfg = settings.get("daemon") or {}
+    now = datetime.now(timezone.utc)
+    due_times = [next_due(load_source_schedule(state, source.get("id", "unknown"))) or now for source in sources]
+    wait = min((due_at - now).total_seconds() for due_at in due_times) if due_times else DAEMON_MAX_SLEEP_SECONDS
+    return min(max(wait, float(cfg.get("idle_check_seconds", DEFAULT_IDLE_CHECK_SECONDS))), DAEMON_MAX_SLEEP_SECONDS)
+
+
+def run_daemon(workers: int | None = None, max_cycles: int | None = None) -> None:
+    """
+    Keep running and poll every source on its own schedule (see schedule.py) until
+    SIGINT/SIGTERM or max_cycles cycles. The state store, HTTP cache, retry policy
+    and per-host throttle stay in memory between cycles; sources.yaml is re-read
+    before every cycle.
+    """
+    setup_logging()
+    os.makedirs("output", exist_ok=True)
+    os.makedirs("data", exist_ok=True)
+
+    settings = load_settings()
+    state = open_state(settings)
+    if workers is None:
+        workers = int(settings.get("workers", DEFAULT_WORKERS))
+    http_cache = setup_http(settings)
+    stop = threading.Event()
+
+    def request_stop(signum, _frame) -> None:
+        logging.info("Received signal %s, stopping after the current cycle", signum)
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    kept_by_source: dict[str, list[Job]] = {}
+    unknown_parsers: set[str] = set()
+    cycles = 0
+    try:
+        while not stop.is_set():
+            sources = load_sources()
+            # sources without a parser are never crawled, so they would stay due forever
+            pollable = [source for source in sources if source.get("parser_type", "page_only") in PARSER_MAP]
+            for source in sources:
+                if source not in pollable and source.get("id") not in unknown_parsers:
+                    unknown_parsers.add(source.get("id"))
+                    logging.warning(
+                        "Unknown parser_type=%s for source=%s. Not polled.", source.get("parser_type"), source.get("id")
+                    )
+            now = datetime.now(timezone.utc)
+            due = [
+                source for source in pollable if schedule_due(load_source_schedule(state, source.get("id", "unknown")), now)
+            ]
+            due, skipped_sources = select_due_sources(due, state)
+            if due:
+                daemon_cycle(sources, due, state, settings, workers, kept_by_source, skipped_sources)
+                if http_cache is not None:
+                    http_cache.save()
+                cycles += 1
+                if max_cycles is not None and cycles >= max_cycles:
+                    break
+            wait = seconds_until_next_poll(pollable, state, settings)
+            logging.info("Next check in %.0fs", wait)
+            stop.wait(wait)
+    finally:
+        close_thread_sessions()
+        if http_cache is not None:
+            http_cache.save()
+        state.save()
+        state.close()
+        logging.info("Daemon stopped after %s cycles", cycles)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Collect music-industry jobs into CSV files.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="number of sources to crawl in parallel (overrides settings.workers in sources.yaml)",
+    )
+    parser.add_argument(
+        "--record",
+        nargs="?",
+        const=DEFAULT_ARCHIVE_PATH,
+        default=None,
+        metavar="PATH",
+        help=f"save every HTTP response of this run to an archive (default: {DEFAULT_ARCHIVE_PATH})",
+    )
+    replay = parser.add_mutually_exclusive_group()
+    replay.add_argument(
+        "--replay",
+        nargs="?",
+        const=DEFAULT_ARCHIVE_PATH,
+        default=None,
+        metavar="PATH",
+        help="answer every request from a recorded archive instead of the network",
+    )
+    replay.add_argument(
+        "--replay-server",
+        default=None,
+        metavar="URL",
+        help="answer every request from a running `python src/replay.py serve` stub server",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_DIR,
+        default=None,
+        metavar="DIR",
+        help=f"run serially under cProfile and write per-source and aggregate profiles (default: {PROFILE_DIR})",
+    )
+    parser.add_argument(
+        "--profile-sources",
+        default=None,
+        metavar="ID[,ID...]",
+        help="profile only these source ids (implies --profile)",
+    )
+    parser.add_argument(
+        "--force-refresh",
+        action="store_true",
+        help="ignore what earlier runs remembered: re-read every listing page and detail page",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="keep running and poll each source on its own adaptive schedule (settings.daemon in sources.yaml)",
+    )
+    parser.add_argument(
+        "--max-cycles",
+        type=int,
+        default=None,
+        metavar="N",
+        help="with --daemon, stop after N crawl cycles",
+    )
+    args = parser.parse_args(argv)
+    if args.profile_sources and not args.profile:
+        args.profile = PROFILE_DIR
+    if args.daemon and (args.record or args.replay or args.replay_server or args.profile or args.force_refresh):
+        parser.error("--daemon cannot be combined with --record, --replay, --replay-server, --profile or --force-refresh")
+    if args.max_cycles is not None and not args.daemon:
+        parser.error("--max-cycles requires --daemon")
+    return args
 
 
 if __name__ == "__main__":
-    run()
+    args = parse_args()
+    if args.daemon:
+        run_daemon(workers=args.workers, max_cycles=args.max_cycles)
+    else:
+        run(
+            workers=args.workers,
+            record_path=args.record,
+            replay_path=args.replay,
+            replay_server=args.replay_server,
+            profile_dir=args.profile,
+            profile_sources=args.profile_sources.split(",") if args.profile_sources else None,
+            force_refresh=args.force_refresh,
+        )
@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator
+
+RUN_REPORT_PATH = "output/run_report.json"
+SUMMARY_TOP_SOURCES = 5
+# stages that make up a source's own wall time; "detail_page" runs inside "detail"
+WALL_STAGES = ("listing", "filter", "detail")
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Nearest-rank p50/p90/p99 plus max, rounded to 0.1."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))], 1)
+
+    return {"count": len(ordered), "p50": rank(0.5), "p90": rank(0.9), "p99": rank(0.99), "max": round(ordered[-1], 1)}
+
+
+class _Scope:
+    def __init__(self, source_id: str, stage: str):
+        self.source_id = source_id
+        self.stage = stage
+        self.fetch_seconds = 0.0
+
+
+def _new_source() -> dict:
+    return {"requests": 0, "bytes": 0, "retries": 0, "errors": 0, "cache_hits": 0, "stages": {}, "counts": {}}
+
+
+def _new_stage() -> dict:
+    return {"calls": 0, "seconds": 0.0, "fetch_seconds": 0.0, "fetch_ms": [], "process_ms": []}
+
+
+class RunMetrics:
+    """
+    Per-source, per-stage timings and request counters for one run.
+    Code runs inside `scope(source_id, stage)`; safe_get reports every request to
+    the innermost scope on the calling thread, so time spent waiting on the network
+    is split from time spent parsing. Requests made outside any scope are ignored.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._sources: dict[str, dict] = {}
+            self.started_at = datetime.now(timezone.utc)
+            self._started = time.perf_counter()
+
+    def _source(self, source_id: str) -> dict:
+        return self._sources.setdefault(source_id, _new_source())
+
+    def current(self) -> _Scope | None:
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def join(self, scope: _Scope | None) -> Iterator[None]:
+        """Attribute this thread's requests to a scope opened on another thread."""
+        if scope is None:
+            yield
+            return
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(scope)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    @contextmanager
+    def scope(self, source_id: str, stage: str) -> Iterator[_Scope]:
+        scope = _Scope(source_id, stage)
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(scope)
+        start = time.perf_counter()
+        try:
+            yield scope
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                row = self._source(source_id)["stages"].setdefault(stage, _new_stage())
+                row["calls"] += 1
+                row["seconds"] += elapsed
+                row["fetch_seconds"] += scope.fetch_seconds
+                row["fetch_ms"].append(scope.fetch_seconds * 1000)
+                # concurrent requests inside one scope can add up to more than its wall time
+                row["process_ms"].append(max(0.0, elapsed - scope.fetch_seconds) * 1000)
+
+    def record_request(self, seconds: float, nbytes: int, retry: bool = False, error: bool = False, cached: bool = False) -> None:
+        scope = self.current()
+        if scope is None:
+            return
+        with self._lock:
+            scope.fetch_seconds += seconds
+            row = self._source(scope.source_id)
+            row["requests"] += 1
+            row["bytes"] += nbytes
+            row["retries"] += int(retry)
+            row["errors"] += int(error)
+            row["cache_hits"] += int(cached)
+
+    def set_counts(self, source_id: str, counts: dict) -> None:
+        with self._lock:
+            self._source(source_id)["counts"].update(counts)
+
+    def report(self, **extra) -> dict:
+        with self._lock:
+            sources = {}
+            totals = {key: 0 for key in ("requests", "bytes", "retries", "errors", "cache_hits")}
+            stage_totals: dict[str, float] = {}
+            for source_id, row in self._sources.items():
+                stages = {}
+                for stage, data in row["stages"].items():
+                    stages[stage] = {
+                        "calls": data["calls"],
+                        "seconds": round(data["seconds"], 3),
+                        "fetch_seconds": round(data["fetch_seconds"], 3),
+                        "fetch_ms": percentiles(data["fetch_ms"]),
+                        "process_ms": percentiles(data["process_ms"]),
+                    }
+                    stage_totals[stage] = stage_totals.get(stage, 0.0) + data["seconds"]
+                for key in totals:
+                    totals[key] += row[key]
+                wall = sum(row["stages"][s]["seconds"] for s in WALL_STAGES if s in row["stages"])
+                sources[source_id] = {
+                    "seconds": round(wall, 3),
+                    **{key: row[key] for key in totals},
+                    "stages": stages,
+                    "counts": dict(row["counts"]),
+                }
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_seconds": round(time.perf_counter() - self._started, 3),
+            **extra,
+            "totals": {**totals, "stage_seconds": {stage: round(s, 3) for stage, s in stage_totals.items()}},
+            "sources": sources,
+        }
+
+
+METRICS = RunMetrics()
+
+
+def write_run_report(report: dict, path: str = RUN_REPORT_PATH) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def log_run_summary(report: dict, path: str = RUN_REPORT_PATH) -> None:
+    totals = report["totals"]
+    logging.info(
+        "Run report: %s wall_seconds=%s requests=%s bytes=%s retries=%s errors=%s cache_hits=%s stage_seconds=%s",
+        path,
+        report["wall_seconds"],
+        totals["requests"],
+        totals["bytes"],
+        totals["retries"],
+        totals["errors"],
+        totals["cache_hits"],
+        totals["stage_seconds"],
+    )
+    slowest = sorted(report["sources"].items(), key=lambda item: item[1]["seconds"], reverse=True)
+    for source_id, row in slowest[:SUMMARY_TOP_SOURCES]:
+        stages = row["stages"]
+        pages = stages.get("detail_page", {})
+        logging.info(
+            "slow source=%s seconds=%s listing=%s filter=%s detail=%s detail_pages=%s detail_fetch_p90_ms=%s detail_parse_p90_ms=%s requests=%s retries=%s",
+            source_id,
+            row["seconds"],
+            stages.get("listing", {}).get("seconds", 0),
+            stages.get("filter", {}).get("seconds", 0),
+            stages.get("detail", {}).get("seconds", 0),
+            pages.get("calls", 0),
+            pages.get("fetch_ms", {}).get("p90", "-"),
+            pages.get("process_ms", {}).get("p90", "-"),
+            row["requests"],
+            row["retries"],
+        )
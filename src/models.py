@@ -1,4 +1,6 @@
-from dataclasses import dataclass, asdict
+import sys
+from dataclasses import dataclass, fields
+from operator import attrgetter
 
 
 CSV_HEADERS = [
@@ -20,7 +22,18 @@ CSV_HEADERS = [
 ]
 
 
-@dataclass
+# Low-cardinality fields: thousands of jobs share a handful of values, so each
+# distinct string is stored once. Interned when a Job is built; code that assigns
+# one of these fields later goes through interned() itself.
+INTERNED_FIELDS = frozenset({"base_country", "company", "base_city", "channel", "category", "job_type"})
+
+
+def interned(value):
+    """sys.intern for str values; anything else is returned as is."""
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass(slots=True)
 class Job:
     base_country: str = ""
     company: str = ""
@@ -38,6 +51,18 @@ class Job:
     url: str = ""
     contact: str = ""
 
+    def __post_init__(self) -> None:
+        self.base_country = interned(self.base_country)
+        self.company = interned(self.company)
+        self.base_city = interned(self.base_city)
+        self.channel = interned(self.channel)
+        self.category = interned(self.category)
+        self.job_type = interned(self.job_type)
+
+    def to_csv_tuple(self) -> tuple:
+        """Field values in CSV_HEADERS order."""
+        return _csv_values(self)
+
     def to_csv_row(self) -> dict:
         return {
             "Base国家": self.base_country,
@@ -62,4 +87,25 @@ class Job:
         return f"{self.title.strip().lower()}|{self.company.strip().lower()}"
 
     def as_dict(self) -> dict:
-        return asdict(self)
+        return dict(zip(FIELD_NAMES, _csv_values(self)))
+
+
+class Listing(list):
+    """
+    Jobs a parser read from a source's listing. `complete` is False when part of the
+    listing could not be read (a child sitemap failed, a cap was hit), so the next
+    run has to look at it again. `stopped_early` is True when the parser left out
+    postings it already knew (a walk that ended on a known page, unchanged sitemap
+    entries): those may still be open. Parsers may also return a plain list (complete,
+    read in full).
+    """
+
+    def __init__(self, jobs=(), complete: bool = True, stopped_early: bool = False):
+        super().__init__(jobs)
+        self.complete = complete
+        self.stopped_early = stopped_early
+
+
+FIELD_NAMES = tuple(field.name for field in fields(Job))
+# Job fields are declared in CSV_HEADERS order
+_csv_values = attrgetter(*FIELD_NAMES)
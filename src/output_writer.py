@@ -0,0 +1,203 @@
+import csv
+import importlib.util
+import json
+import logging
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Iterable
+
+from models import CSV_HEADERS, Job
+
+PARQUET_COMPRESSION = "zstd"
+
+
+class DedupeIndex:
+    """
+    Set of dedupe keys kept in a temporary on-disk SQLite database (deleted on
+    close), so memory stays flat however many jobs a run writes.
+    """
+
+    def __init__(self):
+        self._conn = sqlite3.connect("")
+        self._conn.execute("CREATE TABLE keys (key TEXT PRIMARY KEY) WITHOUT ROWID")
+
+    def add(self, key: str) -> bool:
+        """Add key; False if it was already there."""
+        return self._conn.execute("INSERT OR IGNORE INTO keys (key) VALUES (?)", (key,)).rowcount == 1
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def dedupe_key(job: Job) -> str:
+    return job.url or job.fingerprint()
+
+
+class _FileSink(ABC):
+    """One output file, written to <path>.tmp and renamed over <path> on commit."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+
+    @abstractmethod
+    def write(self, row: tuple) -> None: ...
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def commit(self) -> None:
+        self.close()
+        os.replace(self.tmp_path, self.path)
+
+
+class _TextSink(_FileSink):
+    def __init__(self, path: str, encoding: str):
+        super().__init__(path)
+        self._file = open(self.tmp_path, "w", newline="", encoding=encoding)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+
+class _CsvSink(_TextSink):
+    def __init__(self, path: str):
+        super().__init__(path, "utf-8-sig")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_HEADERS)
+
+    def write(self, row: tuple) -> None:
+        self._writer.writerow(row)
+
+
+class _JsonlSink(_TextSink):
+    """One JSON object per job, keyed by CSV_HEADERS."""
+
+    def __init__(self, path: str):
+        super().__init__(path, "utf-8")
+
+    def write(self, row: tuple) -> None:
+        self._file.write(json.dumps(dict(zip(CSV_HEADERS, row)), ensure_ascii=False) + "\n")
+
+
+class _ParquetSink(_FileSink):
+    """String columns named like CSV_HEADERS; every flush() (one per source) becomes a row group."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([(name, pa.string()) for name in CSV_HEADERS])
+        self._writer = pq.ParquetWriter(self.tmp_path, self._schema, compression=PARQUET_COMPRESSION)
+        self._rows: list[tuple] = []
+
+    def write(self, row: tuple) -> None:
+        self._rows.append(row)
+
+    def flush(self) -> None:
+        if not self._rows:
+            return
+        columns = [self._pa.array(list(values), type=self._pa.string()) for values in zip(*self._rows)]
+        self._writer.write_batch(self._pa.RecordBatch.from_arrays(columns, schema=self._schema))
+        self._rows = []
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+
+
+_SINKS = {"csv": (".csv", _CsvSink), "jsonl": (".jsonl", _JsonlSink), "parquet": (".parquet", _ParquetSink)}
+
+
+def available_formats(formats: Iterable[str]) -> list[str]:
+    """The requested export formats that can be written here; csv is always included."""
+    chosen = ["csv"]
+    for name in formats:
+        if name in chosen:
+            continue
+        if name not in _SINKS:
+            logging.warning("Unknown export format=%s, skipping it", name)
+        elif name == "parquet" and importlib.util.find_spec("pyarrow") is None:
+            logging.warning("export format=parquet needs pyarrow (pip install pyarrow), skipping it")
+        else:
+            chosen.append(name)
+    return chosen
+
+
+class JobOutputWriter:
+    """
+    Streams jobs into `<path>.tmp` (plus a .jsonl / .parquet next to it for the
+    other formats) as they arrive, and renames every file over its final name on
+    commit(), so a crash or an aborted run leaves the previous files untouched.
+    Rows are flushed after every write_many(), i.e. after every source.
+    Jobs whose URL (or fingerprint, without a URL) was already written are skipped.
+    """
+
+    def __init__(self, path: str, formats: Iterable[str] = ("csv",), dedupe: bool = True):
+        """`formats` should come from available_formats()."""
+        self.path = path
+        self.count = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        stem = os.path.splitext(path)[0]
+        self._sinks = []
+        for name in formats:
+            extension, sink = _SINKS[name]
+            self._sinks.append(sink(path if name == "csv" else stem + extension))
+        self._index = DedupeIndex() if dedupe else None
+
+    def write(self, job: Job) -> bool:
+        if self._index is not None:
+            key = dedupe_key(job)
+            if not key or not self._index.add(key):
+                return False
+        row = job.to_csv_tuple()
+        for sink in self._sinks:
+            sink.write(row)
+        self.count += 1
+        return True
+
+    def write_many(self, jobs: Iterable[Job]) -> int:
+        written = sum(1 for job in jobs if self.write(job))
+        for sink in self._sinks:
+            sink.flush()
+        return written
+
+    def _close_index(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    def commit(self) -> None:
+        self._close_index()
+        for sink in self._sinks:
+            sink.commit()
+
+    def abort(self) -> None:
+        """Leave the final files as they were; rows written so far stay in the .tmp files."""
+        self._close_index()
+        for sink in self._sinks:
+            sink.close()
+        logging.warning("Run aborted: partial output left in %s.tmp, %s unchanged", self.path, self.path)
+
+    def __enter__(self) -> "JobOutputWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
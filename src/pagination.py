@@ -0,0 +1,146 @@
+import logging
+from typing import Callable, TypeVar
+
+import requests
+from bs4 import SoupStrainer
+
+from budget import BudgetExceeded
+from models import Job, Listing
+from throttle import map_concurrent
+from utils import absolute_url, make_soup, normalize_text, safe_get, thread_session
+
+P = TypeVar("P")
+
+DEFAULT_MAX_PAGES = 5
+DEFAULT_PAGE_CONCURRENCY = 3
+# next_page_selector is matched against these tags only
+NEXT_LINK_TAGS = SoupStrainer(["a", "link"])
+
+
+def page_is_known(jobs: list[Job], known_url: Callable[[str], bool] | None) -> bool:
+    """True when every posting on a (non-empty) page is already known."""
+    return known_url is not None and bool(jobs) and all(known_url(job.url) for job in jobs)
+
+
+def _log_stop(page, exc: requests.RequestException) -> None:
+    response = getattr(exc, "response", None)
+    if response is not None and response.status_code == 404:
+        logging.info("No more pages at %s", page)  # the usual way a numbered walk ends
+    else:
+        logging.warning("Stopped paging at %s (%s)", page, exc)
+
+
+def _ends_walk(page_jobs: list[Job], seen: set[str], known_url: Callable[[str], bool] | None) -> bool:
+    """An empty or repeated page (no URL not in `seen`) or one with only known postings is the last."""
+    urls = {job.url for job in page_jobs}
+    if urls <= seen or page_is_known(page_jobs, known_url):
+        return True
+    seen |= urls
+    return False
+
+
+def fetch_numbered_pages(
+    fetch_jobs: Callable[[P], list[Job]],
+    pages: list[P],
+    concurrency: int,
+    known_url: Callable[[str], bool] | None = None,
+    seen: set[str] | None = None,
+) -> tuple[list[Job], int, bool]:
+    """
+    fetch_jobs(page) for pages whose addresses are known up front, `concurrency` at a
+    time, in order. The walk ends after the first page that fails, adds no URL not
+    already in `seen` (the pages walked so far), or holds only known postings.
+    Returns the jobs up to and including that page, the number of pages used and
+    whether the walk stopped on known postings.
+    """
+    seen = set() if seen is None else seen
+    jobs: list[Job] = []
+    used = 0
+
+    def fetch(page: P) -> list[Job] | None:
+        try:
+            return fetch_jobs(page)
+        except BudgetExceeded:
+            raise  # out of time is not the end of the listing
+        except requests.RequestException as exc:
+            _log_stop(page, exc)
+            return None
+
+    for start in range(0, len(pages), max(1, concurrency)):
+        batch = pages[start : start + max(1, concurrency)]
+        for page_jobs in map_concurrent(fetch, batch, concurrency):
+            if page_jobs is None:
+                return jobs, used, False
+            used += 1
+            jobs.extend(page_jobs)
+            if _ends_walk(page_jobs, seen, known_url):
+                return jobs, used, page_is_known(page_jobs, known_url)
+    return jobs, used, False
+
+
+def _next_page_url(html: str, page_url: str, selector: str) -> str:
+    soup = make_soup(html, parse_only=NEXT_LINK_TAGS)
+    node = soup.select_one(selector)
+    return absolute_url(page_url, normalize_text(node.get("href", ""))) if node else ""
+
+
+def fetch_listing_pages(
+    source: dict,
+    session,
+    parse_page: Callable[[str, str], list[Job]],
+    known_url: Callable[[str], bool] | None = None,
+) -> Listing:
+    """
+    Jobs from a source's listing, following its pagination settings:
+    page_url_template ("…/page/{page}/", pages 2..max_pages fetched page_concurrency
+    at a time) or next_page_selector (a CSS selector for the next-page <a>/<link>,
+    followed one page after another). parse_page(page_url, html) parses one page.
+    Without either setting only source["url"] is read.
+    """
+    first_url = source["url"]
+    html = safe_get(session, first_url).text
+    jobs = Listing(parse_page(first_url, html))
+    template = source.get("page_url_template")
+    selector = source.get("next_page_selector")
+    if not template and not selector:
+        return jobs
+
+    max_pages = int(source.get("max_pages", DEFAULT_MAX_PAGES))
+    if max_pages <= 1:
+        return jobs
+    if page_is_known(jobs, known_url):
+        jobs.stopped_early = True
+        return jobs
+
+    seen = {job.url for job in jobs}
+    if template:
+        concurrency = int(source.get("page_concurrency", DEFAULT_PAGE_CONCURRENCY))
+        pages = [template.format(page=number) for number in range(2, max_pages + 1)]
+        more, used, jobs.stopped_early = fetch_numbered_pages(
+            lambda url: parse_page(url, safe_get(thread_session(), url).text), pages, concurrency, known_url, seen
+        )
+        jobs.extend(more)
+    else:
+        # every page links to the next one, so these are fetched one after another
+        used, page_url, visited = 0, first_url, {first_url}
+        while used + 1 < max_pages:
+            page_url = _next_page_url(html, page_url, selector)
+            if not page_url or page_url in visited:
+                break
+            visited.add(page_url)
+            try:
+                html = safe_get(session, page_url).text
+            except BudgetExceeded:
+                raise
+            except requests.RequestException as exc:
+                _log_stop(page_url, exc)
+                break
+            page_jobs = parse_page(page_url, html)
+            used += 1
+            jobs.extend(page_jobs)
+            if _ends_walk(page_jobs, seen, known_url):
+                jobs.stopped_early = page_is_known(page_jobs, known_url)
+                break
+
+    logging.info("source=%s read %s listing pages (max_pages=%s)", source["id"], used + 1, max_pages)
+    return jobs
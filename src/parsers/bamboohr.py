@@ -1,28 +1,67 @@
-import json
 import logging
-import re
+from urllib.parse import urlsplit
 
+import requests
+
+from budget import BudgetExceeded
 from models import Job
 from utils import absolute_url, extract_job_type, make_soup, normalize_text, safe_get
 
 
-def _extract_json_blob(html: str) -> list[dict]:
-    # Best effort: find JS data blob used by BambooHR.
-    matches = re.findall(r"opening\s*:\s*(\{.*?\})\s*,\s*departments", html, flags=re.DOTALL)
-    parsed = []
-    for match in matches:
-        try:
-            parsed.append(json.loads(match))
-        except json.JSONDecodeError:
+def list_url(source: dict) -> str:
+    """The careers site's job list JSON, e.g. https://acme.bamboohr.com/careers/list."""
+    if source.get("bamboohr_list_url"):
+        return source["bamboohr_list_url"]
+    parts = urlsplit(source["url"])
+    path = parts.path.rstrip("/")
+    base = path if path.endswith("/careers") else "/careers"
+    return f"{parts.scheme}://{parts.netloc}{base}/list"
+
+
+def _location_text(item: dict) -> str:
+    if item.get("isRemote"):
+        return "Remote"
+    location = item.get("location") or item.get("atsLocation") or {}
+    if isinstance(location, str):
+        return normalize_text(location)
+    parts = [location.get("city"), location.get("state") or location.get("province")]
+    return ", ".join(normalize_text(part) for part in parts if part)
+
+
+def _parse_list(source: dict, session) -> list[Job]:
+    url = list_url(source)
+    payload = safe_get(session, url).json()
+    items = payload.get("result") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise ValueError("no result list in BambooHR job list")
+
+    jobs = []
+    for item in items:
+        title = normalize_text(item.get("jobOpeningName", ""))
+        job_id = item.get("id")
+        if not title or job_id in (None, ""):
             continue
-    return parsed
+        country = (item.get("atsLocation") or {}).get("country") or ""
+        employment = normalize_text(item.get("employmentStatusLabel", ""))
+        jobs.append(
+            Job(
+                base_country=source.get("default_country") or normalize_text(country),
+                company=source.get("name", ""),
+                title=title,
+                base_city=_location_text(item),
+                posting_date=normalize_text(item.get("datePosted", "")),
+                channel=source.get("channel", ""),
+                category=normalize_text(item.get("departmentLabel", "")),
+                job_type=extract_job_type(employment) or extract_job_type(title),
+                url=absolute_url(url, str(job_id)),
+            )
+        )
+    return jobs
 
 
-def parse_source(source: dict, session) -> list[Job]:
+def _parse_html(source: dict, session) -> list[Job]:
     jobs = []
     resp = safe_get(session, source["url"])
-
-    # Primary: parse cards/links from rendered HTML.
     soup = make_soup(resp.text)
     for a_tag in soup.select("a[href*='careers']") + soup.select("a[href*='job']"):
         title = normalize_text(a_tag.get_text(" ", strip=True))
@@ -46,24 +85,21 @@ def parse_source(source: dict, session) -> list[Job]:
                 url=absolute_url(source["url"], href),
             )
         )
+    return jobs
 
-    # Fallback: attempt to parse JS blob when available.
-    for item in _extract_json_blob(resp.text):
-        title = normalize_text(item.get("jobOpeningName", ""))
-        href = normalize_text(item.get("url", ""))
-        if not title or not href:
-            continue
-        jobs.append(
-            Job(
-                base_country=source.get("default_country", ""),
-                company=source.get("name", ""),
-                title=title,
-                base_city=normalize_text(item.get("location", "")),
-                channel=source.get("channel", ""),
-                job_type=extract_job_type(title),
-                url=absolute_url(source["url"], href),
-            )
-        )
+
+def parse_source(source: dict, session) -> list[Job]:
+    """
+    Read the careers site's job list JSON (title, location, department, employment
+    type in one request); scan the HTML for job links only when that endpoint fails.
+    """
+    try:
+        jobs = _parse_list(source, session)
+    except BudgetExceeded:
+        raise
+    except (requests.RequestException, ValueError) as exc:
+        logging.warning("bamboohr job list failed for %s (%s); falling back to HTML", source["id"], exc)
+        jobs = _parse_html(source, session)
 
     logging.info("bamboohr parser extracted %s candidates from %s", len(jobs), source["id"])
     return jobs
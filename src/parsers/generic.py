@@ -1,7 +1,11 @@
 import logging
+from typing import Callable
+
+from bs4 import SoupStrainer
 
 from models import Job
-from utils import absolute_url, extract_job_type, make_soup, normalize_text, safe_get
+from pagination import fetch_listing_pages
+from utils import absolute_url, extract_job_type, make_soup, normalize_text
 
 PREFERRED_URL_HINTS = [
     "/job",
@@ -29,11 +33,13 @@ REJECT_URL_HINTS = [
 
 ROLE_KEYWORDS = ["intern", "internship", "assistant", "coordinator", "administrator", "associate"]
 
+# Only <a href> nodes are used, so skip building the rest of the page.
+LINKS_ONLY = SoupStrainer("a", href=True)
+
 
-def parse_source(source: dict, session) -> list[Job]:
+def parse_page(source: dict, page_url: str, html: str) -> list[Job]:
     jobs = []
-    resp = safe_get(session, source["url"])
-    soup = make_soup(resp.text)
+    soup = make_soup(html, parse_only=LINKS_ONLY)
 
     for a_tag in soup.select("a[href]"):
         href = normalize_text(a_tag.get("href", ""))
@@ -41,7 +47,7 @@ def parse_source(source: dict, session) -> list[Job]:
         if not href or not title:
             continue
 
-        url = absolute_url(source["url"], href)
+        url = absolute_url(page_url, href)
         lowered_url = url.lower()
         lowered_title = title.lower()
 
@@ -63,6 +69,10 @@ def parse_source(source: dict, session) -> list[Job]:
                 url=url,
             )
         )
+    return jobs
+
 
+def parse_source(source: dict, session, known_url: Callable[[str], bool] | None = None) -> list[Job]:
+    jobs = fetch_listing_pages(source, session, lambda url, html: parse_page(source, url, html), known_url)
     logging.info("generic parser extracted %s candidates from %s", len(jobs), source["id"])
     return jobs
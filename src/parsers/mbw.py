@@ -1,13 +1,27 @@
 import logging
+from typing import Callable
+
+from bs4 import SoupStrainer
 
 from models import Job
-from utils import absolute_url, make_soup, normalize_text, safe_get
+from pagination import fetch_listing_pages
+from utils import absolute_url, make_soup, normalize_text
+
+
+def _is_card(name: str, attrs: dict) -> bool:
+    classes = attrs.get("class") or ""
+    if isinstance(classes, str):
+        classes = classes.split()
+    return name in ("article", "li") or "job" in classes
+
 
+# Cards are <article>, <li> or .job elements; nothing outside them is read.
+CARDS_ONLY = SoupStrainer(_is_card)
 
-def parse_source(source: dict, session) -> list[Job]:
+
+def parse_page(source: dict, page_url: str, html: str) -> list[Job]:
     jobs = []
-    resp = safe_get(session, source["url"])
-    soup = make_soup(resp.text)
+    soup = make_soup(html, parse_only=CARDS_ONLY)
 
     for card in soup.select("article") + soup.select(".job") + soup.select("li"):
         a_tag = card.select_one("a[href]")
@@ -27,9 +41,14 @@ def parse_source(source: dict, session) -> list[Job]:
                 title=title,
                 posting_date=normalize_text(date_node.get_text(" ", strip=True)) if date_node else "",
                 channel=source.get("channel", ""),
-                url=absolute_url(source["url"], href),
+                url=absolute_url(page_url, href),
             )
         )
 
+    return jobs
+
+
+def parse_source(source: dict, session, known_url: Callable[[str], bool] | None = None) -> list[Job]:
+    jobs = fetch_listing_pages(source, session, lambda url, html: parse_page(source, url, html), known_url)
     logging.info("mbw parser extracted %s candidates from %s", len(jobs), source["id"])
     return jobs
@@ -1,13 +1,29 @@
 import logging
+from typing import Callable
+
+from bs4 import SoupStrainer
 
 from models import Job
-from utils import absolute_url, make_soup, normalize_text, safe_get
+from pagination import fetch_listing_pages
+from utils import absolute_url, make_soup, normalize_text
+
+
+def _is_listing_node(name: str, attrs: dict) -> bool:
+    classes = attrs.get("class") or ""
+    if isinstance(classes, str):
+        classes = classes.split()
+    if name == "article" or "jobs-listing" in classes:
+        return True
+    return name == "a" and "job" in (attrs.get("href") or "")
+
 
+# Keep only the subtrees the selectors below can match.
+LISTING_ONLY = SoupStrainer(_is_listing_node)
 
-def parse_source(source: dict, session) -> list[Job]:
+
+def parse_page(source: dict, page_url: str, html: str) -> list[Job]:
     jobs = []
-    resp = safe_get(session, source["url"])
-    soup = make_soup(resp.text)
+    soup = make_soup(html, parse_only=LISTING_ONLY)
 
     selectors = [".jobs-listing a[href]", "article a[href]", "a[href*='job']"]
     for selector in selectors:
@@ -22,9 +38,14 @@ def parse_source(source: dict, session) -> list[Job]:
                     company=source.get("name", ""),
                     title=title,
                     channel=source.get("channel", ""),
-                    url=absolute_url(source["url"], href),
+                    url=absolute_url(page_url, href),
                 )
             )
 
+    return jobs
+
+
+def parse_source(source: dict, session, known_url: Callable[[str], bool] | None = None) -> list[Job]:
+    jobs = fetch_listing_pages(source, session, lambda url, html: parse_page(source, url, html), known_url)
     logging.info("musicweek parser extracted %s candidates from %s", len(jobs), source["id"])
     return jobs
@@ -0,0 +1,191 @@
+import gzip
+import io
+import logging
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, time, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterator
+from urllib.parse import unquote, urlsplit
+
+import requests
+
+from budget import BudgetExceeded
+from models import Job, Listing
+from utils import extract_job_type, normalize_text, safe_get
+
+DEFAULT_MAX_SITEMAPS = 20
+DEFAULT_MAX_ENTRIES = 200
+# <sitemap> entries point at child sitemaps; the others are pages or feed items
+ENTRY_TAGS = {"url", "sitemap", "item", "entry"}
+MODIFIED_TAGS = ("lastmod", "updated", "pubDate", "published", "date")
+SLUG_NOISE = re.compile(r"(?:[-_ ]?\d+)+$|\.\w+$")
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _entry_fields(elem: ET.Element) -> tuple[str, str, str]:
+    """(url, title, modified) of one <url>/<sitemap>/<item>/<entry> element."""
+    values: dict[str, str] = {}
+    url = ""
+    for child in elem:
+        name = _local_name(child.tag)
+        if name == "link" and child.get("href"):
+            # Atom: <link href=…>, the rel="alternate" one (or the one without rel) is the page
+            if child.get("rel", "alternate") == "alternate" and not url:
+                url = child.get("href")
+            continue
+        values.setdefault(name, (child.text or "").strip())
+    url = url or values.get("loc") or values.get("link") or values.get("guid", "")
+    modified = next((values[name] for name in MODIFIED_TAGS if values.get(name)), "")
+    return url.strip(), values.get("title", ""), modified
+
+
+def iter_entries(content: bytes) -> Iterator[tuple[bool, str, str, str]]:
+    """
+    (is_sitemap, url, title, modified) for each entry of a sitemap, sitemap index,
+    RSS or Atom document (gzipped or not). Parsed incrementally and each element
+    is dropped once read, so memory stays flat on sitemaps with 50,000 URLs.
+    """
+    stream = io.BytesIO(content)
+    if content[:2] == b"\x1f\x8b":
+        stream = gzip.GzipFile(fileobj=stream)
+    open_elements: list[ET.Element] = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            open_elements.append(elem)
+            continue
+        open_elements.pop()
+        if _local_name(elem.tag) not in ENTRY_TAGS:
+            continue
+        url, title, modified = _entry_fields(elem)
+        if url:
+            yield _local_name(elem.tag) == "sitemap", url, title, modified
+        if open_elements:
+            open_elements[-1].remove(elem)
+
+
+def parse_time(text: str) -> datetime | None:
+    """W3C datetime (sitemaps, Atom) or RFC 822 date (RSS) as an aware datetime; None if unreadable."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        if len(text) == 10:
+            # a bare date: count it as the end of that day, so same-day changes are never missed
+            return datetime.combine(datetime.fromisoformat(text).date(), time.max, timezone.utc)
+        parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(text)
+        except (TypeError, ValueError):
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def title_from_url(url: str) -> str:
+    """'…/jobs/royalties-assistant-4821/' -> 'Royalties Assistant' (sitemaps carry no titles)."""
+    segments = [segment for segment in urlsplit(url).path.split("/") if segment]
+    slug = SLUG_NOISE.sub("", unquote(segments[-1])) if segments else ""
+    return normalize_text(re.sub(r"[-_+]+", " ", slug)).title()
+
+
+def parse_source(
+    source: dict,
+    session,
+    known_url: Callable[[str], bool] | None = None,
+    since: datetime | None = None,
+) -> Listing:
+    """
+    Job URLs from a sitemap (or sitemap index) or an RSS/Atom feed at source["url"].
+    Only entries matching url_patterns and modified after `since` (the previous
+    complete run) are returned; entries without a date are returned while unknown.
+    Child sitemaps whose lastmod is older than `since` are not fetched at all.
+    The listing is incomplete when a child sitemap failed or max_sitemaps or
+    max_entries cut the read short, so the next run reads those changes again.
+    """
+    patterns = [re.compile(pattern, re.IGNORECASE) for pattern in source.get("url_patterns") or []]
+    max_sitemaps = int(source.get("max_sitemaps", DEFAULT_MAX_SITEMAPS))
+    max_entries = int(source.get("max_entries", DEFAULT_MAX_ENTRIES))
+
+    unchanged = 0
+
+    def changed(url: str, modified: str) -> bool:
+        nonlocal unchanged
+        when = parse_time(modified)
+        if when is None:
+            is_changed = known_url is None or not known_url(url)
+        else:
+            is_changed = since is None or when > since
+        unchanged += not is_changed
+        return is_changed
+
+    queue, queued = [source["url"]], {source["url"]}
+    entries: list[tuple[datetime | None, str, str]] = []
+    total = 0
+    documents = 0
+    complete = True
+    while queue and documents < max_sitemaps:
+        document_url = queue.pop(0)
+        try:
+            content = safe_get(session, document_url).content
+            documents += 1
+            for is_sitemap, url, title, modified in iter_entries(content):
+                if is_sitemap:
+                    if url not in queued and changed(url, modified):
+                        queue.append(url)
+                        queued.add(url)
+                    continue
+                total += 1
+                if patterns and not any(pattern.search(url) for pattern in patterns):
+                    continue
+                if changed(url, modified):
+                    entries.append((parse_time(modified), url, title))
+        except BudgetExceeded:
+            raise
+        except (requests.RequestException, ET.ParseError) as exc:
+            if document_url == source["url"]:
+                raise
+            logging.warning("Skipping sitemap %s for %s (%s)", document_url, source["id"], exc)
+            complete = False
+    if queue:
+        logging.warning("source=%s: %s sitemaps left unread (max_sitemaps=%s)", source["id"], len(queue), max_sitemaps)
+        complete = False
+
+    # unknown entries first, then newest first: max_entries keeps the most recent
+    # changes, and runs that keep hitting it still work through the backlog
+    floor = datetime.min.replace(tzinfo=timezone.utc)
+    entries.sort(key=lambda entry: entry[0] or floor, reverse=True)
+    if known_url is not None:
+        entries.sort(key=lambda entry: known_url(entry[1]))
+    if len(entries) > max_entries:
+        complete = False
+    jobs = Listing(complete=complete, stopped_early=unchanged > 0)
+    for when, url, title in entries[:max_entries]:
+        # feed items have titles and their date is the posting date; a sitemap's lastmod is only an edit date
+        posting_date = when.date().isoformat() if when and title else ""
+        title = normalize_text(title) or title_from_url(url)
+        jobs.append(
+            Job(
+                base_country=source.get("default_country", ""),
+                company=source.get("name", ""),
+                title=title,
+                posting_date=posting_date,
+                channel=source.get("channel", ""),
+                job_type=extract_job_type(title),
+                url=url,
+            )
+        )
+
+    logging.info(
+        "sitemap parser: %s changed of %s entries (%s returned) from %s documents for %s%s",
+        len(entries),
+        total,
+        len(jobs),
+        documents,
+        source["id"],
+        "" if complete else " (incomplete)",
+    )
+    return jobs
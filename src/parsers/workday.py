@@ -1,14 +1,127 @@
 import logging
+import re
+from datetime import date, timedelta
+from typing import Callable
+from urllib.parse import urlsplit
 
-from models import Job
-from utils import absolute_url, extract_job_type, make_soup, normalize_text, safe_get
+import requests
 
+from budget import BudgetExceeded
+from models import Job, Listing
+from pagination import DEFAULT_PAGE_CONCURRENCY, fetch_numbered_pages, page_is_known
+from utils import absolute_url, extract_job_type, make_soup, normalize_text, safe_get, safe_request, thread_session
 
-def parse_source(source: dict, session) -> list[Job]:
+# Workday's jobs search endpoint refuses pages larger than 20.
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_MAX_PAGES = 25
+LOCALE_SEGMENT = re.compile(r"^[a-z]{2}(?:-[A-Za-z]{2})?$")
+POSTED_DAYS_AGO = re.compile(r"posted\s+(\d+)\s+days?\s+ago", re.IGNORECASE)
+
+
+def workday_endpoints(source: dict) -> tuple[str, str] | None:
+    """
+    (jobs API URL, base for job links) for a myworkdayjobs.com careers URL such as
+    https://acme.wd3.myworkdayjobs.com/en-US/External. Sources on their own domain
+    can set workday_api_url (…/wday/cxs/<tenant>/<site>/jobs) instead.
+    """
+    explicit = source.get("workday_api_url")
+    if explicit:
+        parts = urlsplit(explicit)
+        site = explicit.rstrip("/").split("/")[-2]
+        return explicit, source.get("workday_job_base_url") or f"{parts.scheme}://{parts.netloc}/{site}"
+
+    parts = urlsplit(source.get("url", ""))
+    if not parts.netloc.endswith("myworkdayjobs.com"):
+        return None
+    segments = [segment for segment in parts.path.split("/") if segment]
+    sites = [segment for segment in segments if not LOCALE_SEGMENT.match(segment)]
+    if not sites:
+        return None
+    tenant = parts.netloc.split(".")[0]
+    site = sites[0]
+    prefix = "/".join(segments[: segments.index(site) + 1])
+    return f"{parts.scheme}://{parts.netloc}/wday/cxs/{tenant}/{site}/jobs", f"{parts.scheme}://{parts.netloc}/{prefix}"
+
+
+def _posted_date(text: str, today: date) -> str:
+    """'Posted Today' / 'Posted Yesterday' / 'Posted 3 Days Ago' as an ISO date; '30+ Days Ago' stays blank."""
+    lowered = (text or "").lower()
+    if "30+" in lowered:
+        return ""
+    if "today" in lowered:
+        return today.isoformat()
+    if "yesterday" in lowered:
+        return (today - timedelta(days=1)).isoformat()
+    match = POSTED_DAYS_AGO.search(lowered)
+    return (today - timedelta(days=int(match.group(1)))).isoformat() if match else ""
+
+
+def _fetch_page(session, api_url: str, offset: int, limit: int) -> dict:
+    payload = {"appliedFacets": {}, "limit": limit, "offset": offset, "searchText": ""}
+    return safe_request(session, "POST", api_url, json_body=payload).json()
+
+
+def _jobs_from_page(page: dict, source: dict, base_url: str, today: date) -> list[Job]:
+    jobs = []
+    for posting in page.get("jobPostings") or []:
+        title = normalize_text(posting.get("title", ""))
+        path = posting.get("externalPath") or ""
+        if not title or not path:
+            continue
+        jobs.append(
+            Job(
+                base_country=source.get("default_country", ""),
+                company=source.get("name", ""),
+                title=title,
+                base_city=normalize_text(posting.get("locationsText", "")),
+                posting_date=_posted_date(posting.get("postedOn", ""), today),
+                channel=source.get("channel", ""),
+                job_type=extract_job_type(title),
+                url=base_url.rstrip("/") + path,
+            )
+        )
+    return jobs
+
+
+def _parse_api(
+    source: dict, session, api_url: str, base_url: str, known_url: Callable[[str], bool] | None
+) -> Listing:
     """
-    Best-effort Workday parser for static HTML snapshots.
-    If no jobs are found, caller can still create a page_only entry.
+    Newest postings come first, so pages are fetched in concurrent batches and the
+    walk stops after a page whose postings are all already known.
     """
+    limit = int(source.get("workday_page_size", DEFAULT_PAGE_SIZE))
+    max_pages = int(source.get("max_pages", DEFAULT_MAX_PAGES))
+    concurrency = int(source.get("page_concurrency", DEFAULT_PAGE_CONCURRENCY))
+    today = date.today()
+
+    def fetch_jobs(offset: int) -> list[Job]:
+        return _jobs_from_page(_fetch_page(thread_session(), api_url, offset, limit), source, base_url, today)
+
+    first = _fetch_page(session, api_url, 0, limit)
+    jobs = Listing(_jobs_from_page(first, source, base_url, today))
+    total = int(first.get("total") or 0)  # only the first page carries the total
+    offsets = list(range(limit, min(total, max_pages * limit), limit))
+    pages_used = 0
+    if offsets and page_is_known(jobs, known_url):
+        jobs.stopped_early = True
+    elif offsets:
+        seen = {job.url for job in jobs}
+        more, pages_used, jobs.stopped_early = fetch_numbered_pages(fetch_jobs, offsets, concurrency, known_url, seen)
+        jobs.extend(more)
+
+    logging.info(
+        "workday API: %s postings from %s of %s pages (total=%s) for %s",
+        len(jobs),
+        pages_used + 1,
+        len(offsets) + 1,
+        total,
+        source["id"],
+    )
+    return jobs
+
+
+def _parse_html(source: dict, session) -> list[Job]:
     jobs = []
     resp = safe_get(session, source["url"])
     soup = make_soup(resp.text)
@@ -37,6 +150,24 @@ def parse_source(source: dict, session) -> list[Job]:
                 url=absolute_url(source["url"], href),
             )
         )
+    return jobs
+
+
+def parse_source(source: dict, session, known_url: Callable[[str], bool] | None = None) -> list[Job]:
+    """
+    Workday careers sites render jobs client-side, so read the JSON jobs search
+    endpoint behind them. Falls back to a best-effort scan of the static HTML when
+    the source is not on Workday's API (or the API fails).
+    """
+    endpoints = workday_endpoints(source)
+    if endpoints is not None:
+        try:
+            return _parse_api(source, session, *endpoints, known_url)
+        except BudgetExceeded:
+            raise  # out of time: the HTML fallback would not get a request through either
+        except (requests.RequestException, ValueError) as exc:
+            logging.warning("workday API failed for %s (%s); falling back to HTML", source["id"], exc)
 
+    jobs = _parse_html(source, session)
     logging.info("workday parser extracted %s candidates from %s", len(jobs), source["id"])
     return jobs
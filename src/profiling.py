@@ -0,0 +1,79 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+PROFILE_DIR = "output/profiles"
+SUMMARY_FILE = "summary.txt"
+AGGREGATE_FILE = "all.prof"
+SUMMARY_TOP_FUNCTIONS = 40
+
+
+def _summary(stats: pstats.Stats, title: str, limit: int) -> str:
+    out = io.StringIO()
+    out.write(f"{title}\n\n")
+    for sort_key in ("cumulative", "tottime"):
+        out.write(f"=== top {limit} by {sort_key} ===\n")
+        stats.stream = out
+        stats.sort_stats(sort_key).print_stats(limit)
+    return out.getvalue()
+
+
+class SourceProfiler:
+    """
+    cProfile per source: `profile(source_id)` wraps one source's listing and detail
+    stages. Only profiles the calling thread, so the run has to be serial (main.run
+    takes care of that). save() writes <source>.prof / <source>.txt for every
+    profiled source plus all.prof and summary.txt for all of them together.
+    """
+
+    def __init__(self, path: str = PROFILE_DIR, only: Iterable[str] | None = None, limit: int = SUMMARY_TOP_FUNCTIONS):
+        self.path = path
+        self.only = set(only) if only else None
+        self.limit = limit
+        self._profiles: dict[str, cProfile.Profile] = {}
+
+    def wants(self, source_id: str) -> bool:
+        return self.only is None or source_id in self.only
+
+    @contextmanager
+    def profile(self, source_id: str) -> Iterator[None]:
+        if not self.wants(source_id):
+            yield
+            return
+        profiler = self._profiles.setdefault(source_id, cProfile.Profile())
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    def save(self) -> None:
+        unmatched = sorted((self.only or set()) - set(self._profiles))
+        if unmatched:
+            logging.warning("Profiling: no source with id %s", ", ".join(unmatched))
+        if not self._profiles:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        aggregate = None
+        for source_id, profiler in self._profiles.items():
+            stats = pstats.Stats(profiler)
+            stats.dump_stats(os.path.join(self.path, f"{source_id}.prof"))
+            with open(os.path.join(self.path, f"{source_id}.txt"), "w", encoding="utf-8") as f:
+                f.write(_summary(stats, f"source={source_id}", self.limit))
+            if aggregate is None:
+                aggregate = pstats.Stats(profiler)
+            else:
+                aggregate.add(profiler)
+        aggregate.dump_stats(os.path.join(self.path, AGGREGATE_FILE))
+        with open(os.path.join(self.path, SUMMARY_FILE), "w", encoding="utf-8") as f:
+            f.write(_summary(aggregate, f"sources={','.join(self._profiles)}", self.limit))
+        logging.info(
+            "Profiles for %s sources written to %s (aggregate: %s)",
+            len(self._profiles),
+            self.path,
+            os.path.join(self.path, SUMMARY_FILE),
+        )
@@ -0,0 +1,165 @@
+"""
+Record every HTTP response of a run into one compact archive, then replay it
+offline: in-process, or through a tiny local HTTP server.
+
+    python src/main.py --record                       # writes data/http_archive.jsonl.gz
+    python src/main.py --replay                       # serves every request from the archive
+    python src/replay.py serve --port 8765            # stub server for the archive
+    python src/main.py --replay-server http://127.0.0.1:8765
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_ARCHIVE_PATH = "data/http_archive.jsonl.gz"
+# Not replayable (connection-level) or private; everything else is kept.
+DROPPED_HEADERS = {"set-cookie", "connection", "keep-alive", "transfer-encoding", "content-encoding", "content-length"}
+
+
+def archive_key(method: str, url: str, body: bytes | None = None) -> str:
+    key = f"{method.upper()} {url}"
+    if body:
+        key += " " + hashlib.sha1(body).hexdigest()
+    return key
+
+
+def _build_response(entry: dict, url: str) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = entry["status"]
+    resp.reason = entry.get("reason", "")
+    resp._content = base64.b64decode(entry["body"])
+    resp.headers = CaseInsensitiveDict(entry.get("headers") or {})
+    resp.encoding = entry.get("encoding")
+    resp.url = url
+    return resp
+
+
+class HttpRecorder:
+    """Collects responses during a run; the last response per request wins."""
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+
+    def record(self, method: str, url: str, resp: requests.Response, body: bytes | None = None) -> None:
+        entry = {
+            "key": archive_key(method, url, body),
+            "method": method.upper(),
+            "url": url,
+            "status": resp.status_code,
+            "reason": resp.reason or "",
+            "headers": {k: v for k, v in resp.headers.items() if k.lower() not in DROPPED_HEADERS},
+            "encoding": resp.encoding,
+            "body": base64.b64encode(resp.content or b"").decode("ascii"),
+        }
+        with self._lock:
+            self._entries[entry["key"]] = entry
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            entries = [self._entries[key] for key in sorted(self._entries)]
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        logging.info("Recorded %s responses to %s", len(entries), self.path)
+
+
+def load_archive(path: str = DEFAULT_ARCHIVE_PATH) -> dict[str, dict]:
+    entries = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry["key"]] = entry
+    return entries
+
+
+class ArchiveReplay:
+    """Answers requests from an archive in-process. Unknown requests fail like a dead host."""
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH):
+        self.path = path
+        self._entries = load_archive(path)
+        logging.info("Replaying %s responses from %s", len(self._entries), path)
+
+    def fetch(self, session, method: str, url: str, timeout: float, body: bytes | None = None) -> requests.Response:
+        entry = self._entries.get(archive_key(method, url, body))
+        if entry is None:
+            raise requests.ConnectionError(f"Not in replay archive: {method} {url}")
+        return _build_response(entry, url)
+
+
+class ServerReplay:
+    """Fetches recorded responses from a running `replay.py serve` stub server."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    def fetch(self, session, method: str, url: str, timeout: float, body: bytes | None = None) -> requests.Response:
+        key = archive_key(method, url, body)
+        resp = session.get(f"{self.base_url}/replay?key={quote(key, safe='')}", timeout=timeout)
+        if resp.status_code == 599:
+            raise requests.ConnectionError(f"Not in replay archive: {method} {url}")
+        resp.url = url
+        return resp
+
+
+def serve(archive_path: str, host: str = "127.0.0.1", port: int = 8765) -> None:
+    entries = load_archive(archive_path)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            logging.debug("replay server: " + fmt, *args)
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            key = (parse_qs(parts.query).get("key") or [""])[0]
+            entry = entries.get(key)
+            if parts.path != "/replay" or entry is None:
+                payload = f"Not in archive: {key}".encode("utf-8")
+                self.send_response(599, "Not Recorded")
+            else:
+                payload = base64.b64decode(entry["body"])
+                self.send_response(entry["status"], entry.get("reason") or None)
+                for name, value in (entry.get("headers") or {}).items():
+                    self.send_header(name, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    logging.info("Serving %s recorded responses from %s on http://%s:%s", len(entries), archive_path, host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    parser = argparse.ArgumentParser(description="Serve a recorded HTTP archive for offline runs.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="serve the archive over HTTP")
+    serve_parser.add_argument("archive", nargs="?", default=DEFAULT_ARCHIVE_PATH)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    serve(args.archive, args.host, args.port)
@@ -0,0 +1,180 @@
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from state import utc_now
+from throttle import host_of
+
+# Worth another try: timeouts, rate limiting and server-side errors. Any other 4xx is final.
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+DEFAULT_MAX_BACKOFF_SECONDS = 30.0
+DEFAULT_MAX_RETRY_AFTER_SECONDS = 120.0
+DEFAULT_CIRCUIT_FAILURES = 5
+DEFAULT_CIRCUIT_COOLDOWN_SECONDS = 300.0
+DEFAULT_FAILURES_BEFORE_BACKOFF = 2
+DEFAULT_PROBE_BACKOFF_HOURS = 24.0
+DEFAULT_MAX_PROBE_INTERVAL_DAYS = 14.0
+SOURCE_HEALTH_META_PREFIX = "source_health:"
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+
+def is_retryable(exc: requests.RequestException) -> bool:
+    response = getattr(exc, "response", None)
+    if response is None:
+        return True  # connection error, timeout, ...
+    return response.status_code in RETRYABLE_STATUSES
+
+
+def retry_after_seconds(response: requests.Response | None) -> float | None:
+    """The Retry-After header as seconds, given either as a number or as an HTTP date."""
+    value = (response.headers.get("Retry-After") if response is not None else None) or ""
+    value = value.strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostCircuitBreaker:
+    """
+    Stops requests to a host after `failure_threshold` consecutive failures
+    (connection errors, timeouts, 429/5xx). After `cooldown_seconds` one probe
+    request is let through; a success closes the circuit, a failure reopens it.
+    Any answer that is not a failure (including 404) resets the count.
+    """
+
+    def __init__(self, failure_threshold: int = DEFAULT_CIRCUIT_FAILURES, cooldown_seconds: float = DEFAULT_CIRCUIT_COOLDOWN_SECONDS):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown_seconds = float(cooldown_seconds)
+        self._lock = threading.Lock()
+        self._failures: dict[str, int] = {}
+        self._open_until: dict[str, float] = {}
+
+    def check(self, url: str) -> None:
+        host = host_of(url)
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return
+            if time.monotonic() < open_until:
+                raise CircuitOpenError(f"Circuit open for {host}, not requesting {url}")
+            # half-open: this request is the probe, everyone else keeps waiting
+            self._open_until[host] = time.monotonic() + self.cooldown_seconds
+
+    def record_success(self, url: str) -> None:
+        host = host_of(url)
+        with self._lock:
+            self._failures.pop(host, None)
+            if self._open_until.pop(host, None) is not None:
+                logging.info("Circuit closed for %s", host)
+
+    def record_failure(self, url: str) -> None:
+        host = host_of(url)
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.failure_threshold:
+                if host not in self._open_until:
+                    logging.warning(
+                        "Circuit open for %s after %s consecutive failures; skipping it for %ss",
+                        host,
+                        failures,
+                        self.cooldown_seconds,
+                    )
+                self._open_until[host] = time.monotonic() + self.cooldown_seconds
+
+
+class RetryPolicy:
+    """
+    How safe_get retries: only retryable failures, exponential backoff with jitter
+    (base * 2^(attempt-1), capped, times 0.5-1.0), never shorter than Retry-After.
+    A Retry-After longer than max_retry_after_seconds is not waited for.
+    """
+
+    def __init__(
+        self,
+        max_backoff_seconds: float = DEFAULT_MAX_BACKOFF_SECONDS,
+        max_retry_after_seconds: float = DEFAULT_MAX_RETRY_AFTER_SECONDS,
+        breaker: HostCircuitBreaker | None = None,
+    ):
+        self.max_backoff_seconds = float(max_backoff_seconds)
+        self.max_retry_after_seconds = float(max_retry_after_seconds)
+        self.breaker = breaker or HostCircuitBreaker()
+
+    def delay(self, attempt: int, backoff_seconds: float, response: requests.Response | None = None) -> float | None:
+        """Seconds to wait before the next attempt, or None when it is not worth waiting."""
+        delay = min(self.max_backoff_seconds, backoff_seconds * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+        retry_after = retry_after_seconds(response)
+        if retry_after is not None:
+            if retry_after > self.max_retry_after_seconds:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+
+def retry_policy_from_settings(settings: dict) -> RetryPolicy:
+    cfg = settings.get("retry") or {}
+    return RetryPolicy(
+        max_backoff_seconds=cfg.get("max_backoff_seconds", DEFAULT_MAX_BACKOFF_SECONDS),
+        max_retry_after_seconds=cfg.get("max_retry_after_seconds", DEFAULT_MAX_RETRY_AFTER_SECONDS),
+        breaker=HostCircuitBreaker(
+            failure_threshold=cfg.get("circuit_failures", DEFAULT_CIRCUIT_FAILURES),
+            cooldown_seconds=cfg.get("circuit_cooldown_seconds", DEFAULT_CIRCUIT_COOLDOWN_SECONDS),
+        ),
+    )
+
+
+def load_source_health(state, source_id: str) -> dict:
+    raw = state.get_meta(SOURCE_HEALTH_META_PREFIX + source_id)
+    return json.loads(raw) if raw else {}
+
+
+def source_due(health: dict, now: datetime | None = None) -> bool:
+    """False while a chronically failing source waits for its next probe."""
+    next_probe = health.get("next_probe")
+    if not next_probe:
+        return True
+    try:
+        return (now or utc_now()) >= datetime.fromisoformat(next_probe)
+    except (TypeError, ValueError):
+        return True
+
+
+def update_source_health(state, source_id: str, ok: bool, settings: dict | None = None) -> dict:
+    """
+    Count consecutive failed runs of a source. From `failures_before_backoff` on, the
+    next probe is pushed out by probe_backoff_hours, doubling per further failure up to
+    max_probe_interval_days. One successful run resets everything.
+    """
+    cfg = (settings or {}).get("source_health") or {}
+    health = load_source_health(state, source_id)
+    now = utc_now()
+    if ok:
+        health = {"consecutive_failures": 0, "last_success": now.isoformat(timespec="seconds")}
+    else:
+        failures = int(health.get("consecutive_failures", 0)) + 1
+        health["consecutive_failures"] = failures
+        health["last_failure"] = now.isoformat(timespec="seconds")
+        threshold = int(cfg.get("failures_before_backoff", DEFAULT_FAILURES_BEFORE_BACKOFF))
+        if failures >= threshold:
+            hours = float(cfg.get("probe_backoff_hours", DEFAULT_PROBE_BACKOFF_HOURS)) * 2 ** (failures - threshold)
+            hours = min(hours, float(cfg.get("max_probe_interval_days", DEFAULT_MAX_PROBE_INTERVAL_DAYS)) * 24)
+            health["next_probe"] = (now + timedelta(hours=hours)).isoformat(timespec="seconds")
+    state.set_meta(SOURCE_HEALTH_META_PREFIX + source_id, json.dumps(health))
+    return health
@@ -0,0 +1,72 @@
+import json
+from datetime import datetime, timedelta
+
+from state import utc_now
+
+DEFAULT_MIN_INTERVAL_HOURS = 1.0
+DEFAULT_MAX_INTERVAL_HOURS = 168.0
+DEFAULT_INITIAL_INTERVAL_HOURS = 24.0
+# weight of the latest poll in the smoothed new-jobs-per-hour rate
+RATE_SMOOTHING = 0.3
+SCHEDULE_META_PREFIX = "source_schedule:"
+
+
+def interval_bounds(source: dict, settings: dict | None = None) -> tuple[float, float]:
+    """(min, max) polling interval in hours: the source's own, else settings.daemon's."""
+    cfg = (settings or {}).get("daemon") or {}
+    low = float(source.get("min_interval_hours", cfg.get("min_interval_hours", DEFAULT_MIN_INTERVAL_HOURS)))
+    high = float(source.get("max_interval_hours", cfg.get("max_interval_hours", DEFAULT_MAX_INTERVAL_HOURS)))
+    return low, max(low, high)
+
+
+def load_source_schedule(state, source_id: str) -> dict:
+    raw = state.get_meta(SCHEDULE_META_PREFIX + source_id)
+    return json.loads(raw) if raw else {}
+
+
+def next_due(schedule: dict) -> datetime | None:
+    try:
+        return datetime.fromisoformat(schedule["next_due"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def schedule_due(schedule: dict, now: datetime | None = None) -> bool:
+    """True for sources never scheduled and those whose next poll time has come."""
+    due_at = next_due(schedule)
+    return due_at is None or (now or utc_now()) >= due_at
+
+
+def update_source_schedule(
+    state, source: dict, new_count: int, ok: bool, settings: dict | None = None, now: datetime | None = None
+) -> dict:
+    """
+    Record one poll of a source and pick its next one. The smoothed rate of new jobs
+    per hour is updated from every successful poll after the first (whose new jobs
+    are the backlog, not a rate); the interval is the expected wait for one new job,
+    kept within interval_bounds. A failed poll keeps the interval as it was.
+    """
+    cfg = (settings or {}).get("daemon") or {}
+    source_id = source.get("id", "unknown")
+    now = now or utc_now()
+    low, high = interval_bounds(source, settings)
+    schedule = load_source_schedule(state, source_id)
+    interval = float(schedule.get("interval_hours", cfg.get("initial_interval_hours", DEFAULT_INITIAL_INTERVAL_HOURS)))
+
+    if ok:
+        last_polled = schedule.get("last_polled")
+        if last_polled:
+            elapsed = max((now - datetime.fromisoformat(last_polled)).total_seconds() / 3600, 1 / 60)
+            observed = new_count / elapsed
+            previous = schedule.get("new_per_hour")
+            rate = observed if previous is None else RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * previous
+            schedule["new_per_hour"] = round(rate, 6)
+            interval = 1 / rate if rate > 0 else high
+        schedule["last_polled"] = now.isoformat(timespec="seconds")
+        schedule["last_new"] = new_count
+
+    interval = min(max(interval, low), high)
+    schedule["interval_hours"] = round(interval, 3)
+    schedule["next_due"] = (now + timedelta(hours=interval)).isoformat(timespec="seconds")
+    state.set_meta(SCHEDULE_META_PREFIX + source_id, json.dumps(schedule))
+    return schedule
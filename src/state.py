@@ -1,14 +1,31 @@
 import json
+import logging
 import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Set
 
+from models import Job
+
 
 STATE_PATH = "data/state.json"
+SQLITE_STATE_PATH = "data/state.sqlite3"
+# per-source cap on remembered listing URLs (the early-stop memory for paginated listings)
+MAX_LISTING_URLS = 5000
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
 
+def _now_iso() -> str:
+    return utc_now().isoformat(timespec="seconds")
 
-def load_state(path: str = STATE_PATH) -> Dict[str, Set[str]]:
+
+def load_state(path: str = STATE_PATH) -> Dict[str, object]:
     if not os.path.exists(path):
-        return {"seen_urls": set(), "seen_fingerprints": set()}
+        return {"seen_urls": set(), "seen_fingerprints": set(), "job_records": {}, "meta": {}}
 
     with open(path, "r", encoding="utf-8") as f:
         raw = json.load(f)
@@ -16,14 +33,299 @@ def load_state(path: str = STATE_PATH) -> Dict[str, Set[str]]:
     return {
         "seen_urls": set(raw.get("seen_urls", [])),
         "seen_fingerprints": set(raw.get("seen_fingerprints", [])),
+        "job_records": dict(raw.get("job_records", {})),
+        "meta": dict(raw.get("meta", {})),
     }
 
 
-def save_state(seen_urls: Set[str], seen_fingerprints: Set[str], path: str = STATE_PATH) -> None:
+def save_state(
+    seen_urls: Set[str],
+    seen_fingerprints: Set[str],
+    job_records: Dict[str, dict] | None = None,
+    path: str = STATE_PATH,
+    meta: Dict[str, str] | None = None,
+) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
     payload = {
         "seen_urls": sorted(seen_urls),
         "seen_fingerprints": sorted(seen_fingerprints),
+        "job_records": {url: job_records[url] for url in sorted(job_records or {})},
+        "meta": {key: meta[key] for key in sorted(meta or {})},
     }
     with open(path, "w", encoding="utf-8") as f:
         json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def make_job_record(job: Job, is_job_page: bool) -> dict:
+    """Snapshot of an enriched job, stored under its URL so later runs can skip the detail fetch."""
+    return {
+        "job": job.as_dict(),
+        "is_job_page": is_job_page,
+        "enriched_at": _now_iso(),
+    }
+
+
+def job_record_is_fresh(record: dict | None, refresh_days: float) -> bool:
+    if not record or "enriched_at" not in record:
+        return False
+    try:
+        enriched_at = datetime.fromisoformat(record["enriched_at"])
+    except (TypeError, ValueError):
+        return False
+    return (utc_now() - enriched_at).total_seconds() <= refresh_days * 86400
+
+
+def load_listing_urls(state, source_id: str) -> Set[str]:
+    """Candidate URLs a source's listing returned on its recent complete runs."""
+    raw = state.get_meta(f"listing_urls:{source_id}")
+    return set(json.loads(raw)) if raw else set()
+
+
+def load_listing_checked_at(state, source_id: str) -> datetime | None:
+    """Start of the last run in which the source's listing was read completely."""
+    raw = state.get_meta(f"listing_checked_at:{source_id}")
+    return datetime.fromisoformat(raw) if raw else None
+
+
+def save_listing_checked_at(state, source_id: str, checked_at: datetime) -> None:
+    state.set_meta(f"listing_checked_at:{source_id}", checked_at.isoformat(timespec="seconds"))
+
+
+def load_listing_snapshot(state, source_id: str, max_age_hours: float) -> dict | None:
+    """
+    The source's last fully processed listing (digest, taken_at, kept jobs), or None
+    when there is none or it is older than max_age_hours.
+    """
+    raw = state.get_meta(f"listing_snapshot:{source_id}")
+    if not raw:
+        return None
+    snapshot = json.loads(raw)
+    try:
+        taken_at = datetime.fromisoformat(snapshot["taken_at"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if (utc_now() - taken_at).total_seconds() > max_age_hours * 3600:
+        return None
+    return snapshot
+
+
+def save_listing_snapshot(
+    state, source_id: str, digest: str, kept_jobs: list[Job], taken_at: str | None = None
+) -> None:
+    """taken_at: when the listing was last read in full (default: now)."""
+    snapshot = {"digest": digest, "taken_at": taken_at or _now_iso(), "jobs": [job.as_dict() for job in kept_jobs]}
+    state.set_meta(f"listing_snapshot:{source_id}", json.dumps(snapshot, ensure_ascii=False))
+
+
+def save_listing_urls(state, source_id: str, urls: Set[str]) -> None:
+    """
+    Remember this run's listing URLs on top of the earlier ones: a run that stopped
+    paging early has not seen the deeper pages, whose postings are still known.
+    The newest MAX_LISTING_URLS are kept.
+    """
+    key = f"listing_urls:{source_id}"
+    previous = json.loads(state.get_meta(key) or "[]")
+    merged = sorted(urls) + [url for url in previous if url not in urls]
+    state.set_meta(key, json.dumps(merged[:MAX_LISTING_URLS], ensure_ascii=False))
+
+
+class JsonStateStore:
+    """
+    The original data/state.json file, loaded into memory and rewritten on save.
+    With path=None the store starts empty and is never written (replayed runs).
+    """
+
+    def __init__(self, path: str | None = STATE_PATH):
+        self.path = path
+        state = load_state(path) if path else load_state("")
+        self.seen_urls: Set[str] = state["seen_urls"]
+        self.seen_fingerprints: Set[str] = state["seen_fingerprints"]
+        self.job_records: Dict[str, dict] = state["job_records"]
+        self.meta: Dict[str, str] = state["meta"]
+
+    def has_url(self, url: str) -> bool:
+        return url in self.seen_urls
+
+    def add_url(self, url: str) -> None:
+        self.seen_urls.add(url)
+
+    def has_fingerprint(self, fingerprint: str) -> bool:
+        return fingerprint in self.seen_fingerprints
+
+    def add_fingerprint(self, fingerprint: str) -> None:
+        self.seen_fingerprints.add(fingerprint)
+
+    def get_job_record(self, url: str) -> dict | None:
+        return self.job_records.get(url)
+
+    def put_job_record(self, url: str, record: dict) -> None:
+        self.job_records[url] = record
+
+    def get_meta(self, key: str) -> str | None:
+        return self.meta.get(key)
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.meta[key] = value
+
+    def prune(self, ttl_days: float) -> int:
+        """JSON state has no seen timestamps, so only expired job records are dropped."""
+        expired = [url for url, record in self.job_records.items() if not job_record_is_fresh(record, ttl_days)]
+        for url in expired:
+            del self.job_records[url]
+        return len(expired)
+
+    def save(self) -> None:
+        if self.path:
+            save_state(self.seen_urls, self.seen_fingerprints, self.job_records, self.path, self.meta)
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteStateStore:
+    """
+    Indexed state in SQLite: lookups hit the primary key instead of in-memory sets,
+    writes are incremental, and every key carries first_seen/last_seen timestamps.
+    Safe to share across threads; everything commits in one transaction on save().
+    """
+
+    def __init__(self, path: str = SQLITE_STATE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS seen_urls (
+                url TEXT PRIMARY KEY,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS seen_fingerprints (
+                fingerprint TEXT PRIMARY KEY,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_records (
+                url TEXT PRIMARY KEY,
+                record TEXT NOT NULL,
+                enriched_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_seen_urls_last_seen ON seen_urls(last_seen);
+            CREATE INDEX IF NOT EXISTS idx_seen_fingerprints_last_seen ON seen_fingerprints(last_seen);
+            CREATE INDEX IF NOT EXISTS idx_job_records_enriched_at ON job_records(enriched_at);
+            """
+        )
+        self._conn.commit()
+
+    def _exists(self, table: str, column: str, value: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(f"SELECT 1 FROM {table} WHERE {column} = ?", (value,)).fetchone()
+        return row is not None
+
+    def _touch(self, table: str, column: str, value: str) -> None:
+        now = _now_iso()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO {table} ({column}, first_seen, last_seen) VALUES (?, ?, ?) "
+                f"ON CONFLICT({column}) DO UPDATE SET last_seen = excluded.last_seen",
+                (value, now, now),
+            )
+
+    def has_url(self, url: str) -> bool:
+        return self._exists("seen_urls", "url", url)
+
+    def add_url(self, url: str) -> None:
+        self._touch("seen_urls", "url", url)
+
+    def has_fingerprint(self, fingerprint: str) -> bool:
+        return self._exists("seen_fingerprints", "fingerprint", fingerprint)
+
+    def add_fingerprint(self, fingerprint: str) -> None:
+        self._touch("seen_fingerprints", "fingerprint", fingerprint)
+
+    def get_job_record(self, url: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT record FROM job_records WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_job_record(self, url: str, record: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_records (url, record, enriched_at) VALUES (?, ?, ?)",
+                (url, json.dumps(record, ensure_ascii=False), record.get("enriched_at", _now_iso())),
+            )
+
+    def get_meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def prune(self, ttl_days: float) -> int:
+        """Forget URLs/fingerprints not seen and job records not enriched within ttl_days."""
+        cutoff = (utc_now() - timedelta(days=ttl_days)).isoformat(timespec="seconds")
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM seen_urls WHERE last_seen < ?", (cutoff,)).rowcount
+            removed += self._conn.execute("DELETE FROM seen_fingerprints WHERE last_seen < ?", (cutoff,)).rowcount
+            removed += self._conn.execute("DELETE FROM job_records WHERE enriched_at < ?", (cutoff,)).rowcount
+        return removed
+
+    def import_json(self, json_path: str) -> bool:
+        """One-shot migration from data/state.json; skipped once it has been done."""
+        if self.get_meta("migrated_from_json") or not os.path.exists(json_path):
+            return False
+        state = load_state(json_path)
+        now = _now_iso()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen_urls (url, first_seen, last_seen) VALUES (?, ?, ?)",
+                [(url, now, now) for url in state["seen_urls"]],
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO seen_fingerprints (fingerprint, first_seen, last_seen) VALUES (?, ?, ?)",
+                [(fp, now, now) for fp in state["seen_fingerprints"]],
+            )
+        for url, record in state["job_records"].items():
+            self.put_job_record(url, record)
+        for key, value in state["meta"].items():
+            self.set_meta(key, value)
+        self.set_meta("migrated_from_json", now)
+        self.save()
+        logging.info(
+            "Migrated %s urls, %s fingerprints, %s job records from %s into %s",
+            len(state["seen_urls"]),
+            len(state["seen_fingerprints"]),
+            len(state["job_records"]),
+            json_path,
+            self.path,
+        )
+        return True
+
+    def save(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def open_state(settings: dict | None = None):
+    """Open the state backend chosen by settings.state.backend ("json" or "sqlite")."""
+    cfg = (settings or {}).get("state") or {}
+    backend = cfg.get("backend", "json")
+    if backend == "json":
+        return JsonStateStore(cfg.get("path", STATE_PATH))
+    if backend == "sqlite":
+        store = SqliteStateStore(cfg.get("path", SQLITE_STATE_PATH))
+        store.import_json(cfg.get("migrate_from", STATE_PATH))
+        return store
+    raise ValueError(f"Unknown state backend: {backend}")
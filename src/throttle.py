@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator, TypeVar
+from urllib.parse import urlsplit
+
+from budget import BudgetExceeded, Deadline, current_deadline, deadline_scope
+from metrics import METRICS
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_DETAIL_DELAY_SECONDS = 0.5
+DEFAULT_DETAIL_MAX_IN_FLIGHT = 1
+
+_inline = False
+
+
+def set_inline(inline: bool) -> None:
+    """Make map_by_host run every lane on the calling thread, e.g. so a profiler sees all the work."""
+    global _inline
+    _inline = inline
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url or "").netloc.lower()
+
+
+class _HostSlot:
+    def __init__(self, delay_seconds: float, max_in_flight: int):
+        self.delay_seconds = delay_seconds
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.next_start = 0.0
+
+
+class HostThrottle:
+    """
+    Politeness limits per host: a minimum delay between request starts and a cap
+    on concurrent requests. Shared by every source, so two sources on the same
+    host are limited together. When sources disagree, the strictest limit wins.
+    Set `enabled` to False to let every request through at once (replayed runs).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._slots: dict[str, _HostSlot] = {}
+        self.enabled = True
+
+    def configure(self, host: str, delay_seconds: float, max_in_flight: int) -> None:
+        max_in_flight = max(1, int(max_in_flight))
+        delay_seconds = max(0.0, float(delay_seconds))
+        with self._cond:
+            slot = self._slots.get(host)
+            if slot is None:
+                self._slots[host] = _HostSlot(delay_seconds, max_in_flight)
+                return
+            slot.delay_seconds = max(slot.delay_seconds, delay_seconds)
+            slot.max_in_flight = min(slot.max_in_flight, max_in_flight)
+
+    @contextmanager
+    def slot(self, url: str, deadline: Deadline | None = None) -> Iterator[None]:
+        """Wait for the host's turn; raises BudgetExceeded if `deadline` passes while waiting."""
+        if not self.enabled:
+            yield
+            return
+        host = host_of(url)
+        with self._cond:
+            slot = self._slots.setdefault(
+                host, _HostSlot(DEFAULT_DETAIL_DELAY_SECONDS, DEFAULT_DETAIL_MAX_IN_FLIGHT)
+            )
+            while True:
+                wait = slot.next_start - time.monotonic()
+                if slot.in_flight < slot.max_in_flight and wait <= 0:
+                    break
+                if deadline is not None and deadline.at is not None:
+                    if deadline.expired():
+                        raise BudgetExceeded(f"Time budget used up waiting for {host}")
+                    # a deadline without a limit (no budgets set) leaves the wait as it is
+                    wait = deadline.cap(wait) if wait > 0 else deadline.remaining()
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            slot.in_flight += 1
+            slot.next_start = time.monotonic() + slot.delay_seconds
+        try:
+            yield
+        finally:
+            with self._cond:
+                slot.in_flight -= 1
+                self._cond.notify_all()
+
+
+DETAIL_THROTTLE = HostThrottle()
+
+
+def map_concurrent(fn: Callable[[T], R], items: list[T], max_workers: int) -> list[R]:
+    """
+    fn over items on up to max_workers threads, results in input order. The caller's
+    time budget and metrics scope carry over to the worker threads.
+    """
+    if max_workers <= 1 or len(items) <= 1 or _inline:
+        return [fn(item) for item in items]
+    deadline = current_deadline()
+    scope = METRICS.current()
+
+    def call(item: T) -> R:
+        with deadline_scope(deadline), METRICS.join(scope):
+            return fn(item)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix="page") as executor:
+        return list(executor.map(call, items))
+
+
+def source_detail_limits(source: dict) -> tuple[float, int]:
+    delay = source.get("detail_delay_seconds", DEFAULT_DETAIL_DELAY_SECONDS)
+    max_in_flight = source.get("detail_max_in_flight", DEFAULT_DETAIL_MAX_IN_FLIGHT)
+    return float(delay), max(1, int(max_in_flight))
+
+
+def map_by_host(
+    items: list[T],
+    url_of: Callable[[T], str],
+    fn: Callable[[T], R],
+    source: dict,
+    throttle: HostThrottle = DETAIL_THROTTLE,
+    deadline: Deadline | None = None,
+) -> list[R | None]:
+    """
+    Call fn on every item, running different hosts concurrently while each host
+    gets at most `detail_max_in_flight` requests at a time, started at least
+    `detail_delay_seconds` apart. Results come back in input order; items not
+    started before `deadline` get None.
+    """
+    delay, max_in_flight = source_detail_limits(source)
+    queues: dict[str, deque] = defaultdict(deque)
+    for index, item in enumerate(items):
+        host = host_of(url_of(item))
+        queues[host].append(index)
+    for host in queues:
+        throttle.configure(host, delay, max_in_flight)
+
+    results: list = [None] * len(items)
+
+    def lane(queue: deque) -> None:
+        while True:
+            try:
+                index = queue.popleft()
+            except IndexError:
+                return
+            if deadline is not None and deadline.expired():
+                continue
+            item = items[index]
+            try:
+                with throttle.slot(url_of(item), deadline):
+                    results[index] = fn(item)
+            except BudgetExceeded:
+                continue
+
+    lanes = [queue for queue in queues.values() for _ in range(min(max_in_flight, len(queue)))]
+    if len(lanes) <= 1 or _inline:
+        for queue in lanes:
+            lane(queue)
+        return results
+
+    with ThreadPoolExecutor(max_workers=len(lanes), thread_name_prefix="detail") as executor:
+        for future in [executor.submit(lane, queue) for queue in lanes]:
+            future.result()
+    return results
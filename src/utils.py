@@ -1,14 +1,20 @@
-import csv
+import importlib.util
+import json
 import logging
 import re
+import threading
 import time
+from functools import lru_cache
 from typing import Iterable, Optional
-from urllib.parse import urljoin
+from urllib.parse import unquote_plus, urljoin, urlsplit, urlunsplit
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
-from models import CSV_HEADERS, Job
+from budget import BudgetExceeded, current_deadline
+from metrics import METRICS
+from models import Job
+from retry_policy import RetryPolicy, is_retryable
 
 ROLE_KEYWORDS = ["intern", "internship", "assistant", "coordinator"]
 DOMAIN_KEYWORDS = [
@@ -79,6 +85,15 @@ GLOBAL_EXCLUDE_PATTERNS = [
     "reservation of rights",
 ]
 
+HTML_PARSER_BACKENDS = ["html.parser", "lxml"]
+
+# Query parameters that only track where a click came from; they never change the page.
+# ("ref" is not one of them: many boards use it as the vacancy id.)
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "_hsenc", "_hsmi", "gh_src"}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+# fragments that hash-routed ATS pages use as the path of the posting
+ROUTE_FRAGMENT_PREFIXES = ("/", "!")
+
 DEFAULT_HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (X11; Linux x86_64) "
@@ -88,13 +103,68 @@ DEFAULT_HEADERS = {
 }
 
 
+_thread_local = threading.local()
+_open_sessions: list[requests.Session] = []
+_sessions_lock = threading.Lock()
+
+
+_http_cache = None
+_retry_policy = RetryPolicy()
+_http_recorder = None
+_http_replay = None
+_html_parser = "html.parser"
+_use_strainers = True
+
+
+def set_http_cache(cache) -> None:
+    """Route safe_get through an http_cache.HttpCache (or None to disable caching)."""
+    global _http_cache
+    _http_cache = cache
+
+
+def set_retry_policy(policy: RetryPolicy) -> None:
+    """Replace the retry/backoff/circuit-breaker policy safe_get uses (one per run)."""
+    global _retry_policy
+    _retry_policy = policy
+
+
+def set_http_recording(recorder=None, replay=None) -> None:
+    """
+    Record every final safe_get response into a replay.HttpRecorder, or answer every
+    request from a replay.ArchiveReplay / ServerReplay instead of the network.
+    """
+    global _http_recorder, _http_replay
+    _http_recorder = recorder
+    _http_replay = replay
+
+
 def setup_logging() -> None:
     logging.basicConfig(
         level=logging.INFO,
-        format="%(asctime)s | %(levelname)s | %(message)s",
+        format="%(asctime)s | %(levelname)s | %(threadName)s | %(message)s",
     )
 
 
+def thread_session() -> requests.Session:
+    """Return a requests.Session owned by the calling thread (sessions are not shared across threads)."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _thread_local.session = session
+        with _sessions_lock:
+            _open_sessions.append(session)
+    return session
+
+
+def close_thread_sessions() -> None:
+    with _sessions_lock:
+        sessions = list(_open_sessions)
+        _open_sessions.clear()
+    for session in sessions:
+        session.close()
+    _thread_local.__dict__.pop("session", None)
+
+
 def normalize_text(text: Optional[str]) -> str:
     if not text:
         return ""
@@ -108,6 +178,29 @@ def absolute_url(base_url: str, link: str) -> str:
     return urljoin(base_url, link)
 
 
+def _is_tracking_param(pair: str) -> bool:
+    key = unquote_plus(pair.split("=", 1)[0]).lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Dedupe key for a posting URL: lowercase scheme/host, no default port, no tracking
+    parameters and no fragment unless it is a route ("#/job/42", "#!/job/42"). The
+    rest of the query is kept as written. Only used for comparing; job.url stays as is.
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    query = "&".join(pair for pair in parts.query.split("&") if pair and not _is_tracking_param(pair))
+    fragment = parts.fragment if parts.fragment.startswith(ROUTE_FRAGMENT_PREFIXES) else ""
+    return urlunsplit((scheme, netloc, parts.path or "/", query, fragment))
+
+
 def safe_get(
     session: requests.Session,
     url: str,
@@ -115,22 +208,125 @@ def safe_get(
     retries: int = 3,
     backoff_seconds: float = 1.5,
 ):
+    return safe_request(session, "GET", url, timeout=timeout, retries=retries, backoff_seconds=backoff_seconds)
+
+
+def safe_request(
+    session: requests.Session,
+    method: str,
+    url: str,
+    json_body=None,
+    timeout: int = 20,
+    retries: int = 3,
+    backoff_seconds: float = 1.5,
+):
+    """
+    safe_get for any method, optionally sending `json_body` as JSON. Only plain
+    GETs go through the HTTP cache; recording and replay key requests by body too.
+    """
+    body = json.dumps(json_body, sort_keys=True).encode("utf-8") if json_body is not None else None
+    if _http_replay is not None:
+        # a replayed answer never changes, so retrying or waiting is pointless
+        started = time.perf_counter()
+        resp = _http_replay.fetch(session, method, url, timeout, body)
+        METRICS.record_request(time.perf_counter() - started, len(resp.content), error=not resp.ok)
+        resp.raise_for_status()
+        return resp
+
     last_error = None
+    cache = _http_cache if method == "GET" and body is None else None
+    recorder = _http_recorder
+    base_headers = dict(DEFAULT_HEADERS)
+    if body is not None:
+        base_headers["Content-Type"] = "application/json"
+    policy = _retry_policy
+    deadline = current_deadline()
     for attempt in range(1, retries + 1):
+        if deadline is not None and deadline.expired():
+            raise BudgetExceeded(f"Time budget used up, not requesting {url}")
+        policy.breaker.check(url)
+        request_timeout = deadline.cap(timeout) if deadline is not None else timeout
+        started = time.perf_counter()
         try:
-            resp = session.get(url, timeout=timeout, headers=DEFAULT_HEADERS)
+            headers = dict(base_headers)
+            if cache is not None:
+                headers.update(cache.conditional_headers(url))
+            resp = session.request(method, url, data=body, timeout=request_timeout, headers=headers)
+            if resp.status_code == 304 and cache is not None:
+                cached = cache.cached_response(url, resp)
+                if cached is not None:
+                    if recorder is not None:
+                        recorder.record(method, url, cached)
+                    policy.breaker.record_success(url)
+                    METRICS.record_request(time.perf_counter() - started, 0, retry=attempt > 1, cached=True)
+                    return cached
+                resp = session.request(method, url, timeout=request_timeout, headers=base_headers)
+            if recorder is not None:
+                recorder.record(method, url, resp, body)
             resp.raise_for_status()
+            if cache is not None:
+                cache.store(url, resp)
+            policy.breaker.record_success(url)
+            METRICS.record_request(time.perf_counter() - started, len(resp.content), retry=attempt > 1)
             return resp
         except requests.RequestException as exc:
             last_error = exc
-            logging.warning("Request failed (%s/%s) for %s: %s", attempt, retries, url, exc)
-            if attempt < retries:
-                time.sleep(backoff_seconds * attempt)
+            retryable = is_retryable(exc)
+            if retryable:
+                policy.breaker.record_failure(url)
+            else:
+                # the host answered; the page just isn't there for us
+                policy.breaker.record_success(url)
+            delay = None
+            if retryable and attempt < retries:
+                delay = policy.delay(attempt, backoff_seconds, exc.response)
+                remaining = deadline.remaining() if deadline is not None else None
+                if delay is not None and remaining is not None and delay >= remaining:
+                    delay = None  # the budget ends before the next attempt could start
+            logging.warning(
+                "Request failed (%s/%s) for %s: %s%s",
+                attempt,
+                retries,
+                url,
+                exc,
+                "" if delay is not None or attempt == retries else " (not retrying)",
+            )
+            if delay is not None:
+                time.sleep(delay)
+            # the backoff counts as time spent waiting on this request
+            nbytes = len(exc.response.content) if exc.response is not None else 0
+            METRICS.record_request(time.perf_counter() - started, nbytes, retry=attempt > 1, error=True)
+            if delay is None:
+                break
     raise last_error
 
 
-def make_soup(html: str) -> BeautifulSoup:
-    return BeautifulSoup(html, "html.parser")
+def set_html_parser(name: str) -> str:
+    """
+    Choose the BeautifulSoup tree builder used by make_soup: "html.parser" (built in)
+    or "lxml" (faster, needs `pip install lxml`). Falls back to html.parser when the
+    requested backend is unknown or not installed. Returns the backend in use.
+    """
+    global _html_parser
+    if name not in HTML_PARSER_BACKENDS:
+        logging.warning("Unknown html_parser=%s, using html.parser", name)
+        name = "html.parser"
+    elif name != "html.parser" and importlib.util.find_spec(name) is None:
+        logging.warning("html_parser=%s is not installed, using html.parser", name)
+        name = "html.parser"
+    _html_parser = name
+    return name
+
+
+def set_strainers(enabled: bool) -> None:
+    """Let make_soup honour parse_only (the default), or parse whole pages (bench/parity.py)."""
+    global _use_strainers
+    _use_strainers = enabled
+
+
+def make_soup(html: str, parse_only: SoupStrainer | None = None) -> BeautifulSoup:
+    """Parse HTML with the configured backend; parse_only keeps just the matching subtrees."""
+    return BeautifulSoup(html, _html_parser, parse_only=parse_only if _use_strainers else None)
 
 
 def extract_job_type(text: str) -> str:
@@ -146,50 +342,88 @@ def extract_job_type(text: str) -> str:
     return ""
 
 
-def _any_pattern_match(text: str, patterns: list[str]) -> bool:
-    lowered = (text or "").lower()
-    return any(pattern.lower() in lowered for pattern in patterns if pattern)
-
-
-def _count_pattern_matches(text: str, patterns: list[str]) -> int:
-    lowered = (text or "").lower()
-    return sum(1 for pattern in patterns if pattern and pattern.lower() in lowered)
+class KeywordMatcher:
+    """
+    Answers "which keywords of which category appear in this text" with a single
+    regex scan. Keywords only match whole words (plural "s"/"es" allowed), so
+    "lead" no longer matches "leading" and "vp" no longer matches inside words.
+    """
+
+    def __init__(self, categories: dict[str, list[str]]):
+        self.categories = {name: sorted({k.lower() for k in keywords if k}) for name, keywords in categories.items()}
+        keywords = sorted({k for keywords in self.categories.values() for k in keywords}, key=lambda k: (-len(k), k))
+        self._regex = re.compile(self._word_pattern(keywords))
+        # A phrase also counts for the shorter keywords inside it, e.g. "senior associate"
+        # is both "senior" and "associate", because regex matches never overlap.
+        self._hits = {keyword: self._keywords_inside(keyword) for keyword in keywords}
+
+    @staticmethod
+    def _word_pattern(keywords: list[str]) -> str:
+        return r"(?<!\w)(" + "|".join(re.escape(k) for k in keywords) + r")(?:e?s)?(?!\w)"
+
+    def _keywords_inside(self, phrase: str) -> dict[str, frozenset[str]]:
+        hits = {}
+        for name, keywords in self.categories.items():
+            inside = frozenset(k for k in keywords if re.search(self._word_pattern([k]), phrase))
+            if inside:
+                hits[name] = inside
+        return hits
+
+    def scan(self, text: str) -> dict[str, set[str]]:
+        found: dict[str, set[str]] = {name: set() for name in self.categories}
+        for match in self._regex.finditer((text or "").lower()):
+            for name, keywords in self._hits[match.group(1)].items():
+                found[name].update(keywords)
+        return found
+
+
+KEYWORD_MATCHER = KeywordMatcher(
+    {
+        "role": ROLE_KEYWORDS,
+        "domain": DOMAIN_KEYWORDS,
+        "strong_domain": STRONG_DOMAIN_KEYWORDS,
+        "junior": JUNIOR_INCLUDE_KEYWORDS,
+        "not_junior": ["senior associate"],
+        "senior": SENIOR_EXCLUDE_KEYWORDS,
+        "global_exclude": GLOBAL_EXCLUDE_PATTERNS,
+    }
+)
+
+
+@lru_cache(maxsize=None)
+def _compile_source_patterns(patterns: tuple[str, ...]) -> re.Pattern | None:
+    """Per-source include/exclude patterns keep case-insensitive substring matching."""
+    patterns = tuple(p for p in patterns if p)
+    if not patterns:
+        return None
+    return re.compile("|".join(re.escape(p) for p in patterns), re.IGNORECASE)
+
+
+def _source_patterns_match(text: str, patterns) -> bool:
+    regex = _compile_source_patterns(tuple(patterns or ()))
+    return bool(regex and regex.search(text))
 
 
 def is_job_candidate_allowed(job: Job, source: dict) -> bool:
-    combined_text = f"{job.title} {job.url}".lower()
+    combined_text = f"{job.title} {job.url}"
 
-    source_exclude_patterns = source.get("exclude_patterns") or []
-    if _any_pattern_match(combined_text, GLOBAL_EXCLUDE_PATTERNS):
+    if KEYWORD_MATCHER.scan(combined_text)["global_exclude"]:
         return False
-    if _any_pattern_match(combined_text, source_exclude_patterns):
+    if _source_patterns_match(combined_text, source.get("exclude_patterns")):
         return False
 
     include_patterns = source.get("include_patterns")
-    if include_patterns and not _any_pattern_match(combined_text, include_patterns):
+    if include_patterns and not _source_patterns_match(combined_text, include_patterns):
         return False
 
     return True
 
 
 def job_matches_keywords(job: Job, parser_type: str) -> bool:
-    text = f"{job.title} {job.responsibilities} {job.hard_skills} {job.soft_skills}".lower()
     if parser_type == "page_only" and not job.title:
         return True
-    keywords = ROLE_KEYWORDS + DOMAIN_KEYWORDS
-    return any(keyword in text for keyword in keywords)
-
-
-def _title_is_junior(title: str) -> bool:
-    title_l = (title or "").lower()
-    if "senior associate" in title_l:
-        return False
-    return any(keyword in title_l for keyword in JUNIOR_INCLUDE_KEYWORDS)
-
-
-def _title_is_senior(title: str) -> bool:
-    title_l = (title or "").lower()
-    return any(keyword in title_l for keyword in SENIOR_EXCLUDE_KEYWORDS)
+    hits = KEYWORD_MATCHER.scan(f"{job.title} {job.responsibilities} {job.hard_skills} {job.soft_skills}")
+    return bool(hits["role"] or hits["domain"])
 
 
 def _is_job_board_source(source: dict) -> bool:
@@ -206,14 +440,15 @@ def assess_seniority_relevance(job: Job, source: dict) -> tuple[bool, str]:
     if source.get("seniority_mode", "junior_focus") != "junior_focus":
         return True, "kept"
 
-    text = f"{job.title} {job.responsibilities} {job.hard_skills}".lower()
-    domain_match_count = _count_pattern_matches(text, DOMAIN_KEYWORDS)
-    strong_domain_match_count = _count_pattern_matches(text, STRONG_DOMAIN_KEYWORDS)
+    title_hits = KEYWORD_MATCHER.scan(job.title)
+    text_hits = KEYWORD_MATCHER.scan(f"{job.title} {job.responsibilities} {job.hard_skills}")
+    domain_match_count = len(text_hits["domain"])
+    strong_domain_match_count = len(text_hits["strong_domain"])
 
-    if _title_is_junior(job.title):
+    if title_hits["junior"] and not title_hits["not_junior"]:
         return True, "kept"
 
-    is_senior = _title_is_senior(job.title)
+    is_senior = bool(title_hits["senior"])
     allow_senior_if_domain = source.get("allow_senior_if_domain_match", True) is not False
 
     if is_senior:
@@ -227,21 +462,22 @@ def assess_seniority_relevance(job: Job, source: dict) -> tuple[bool, str]:
     return False, "too_senior"
 
 
-def dedupe_by_url(jobs: Iterable[Job]) -> list[Job]:
-    seen = set()
+def dedupe_candidates(jobs: Iterable[Job]) -> list[Job]:
+    """
+    Merge candidates whose URLs share a canonical_url straight after parsing, keeping
+    the first occurrence and filling its empty fields from later ones (e.g. a date
+    that only one of several overlapping selectors picked up).
+    """
+    by_key: dict[str, Job] = {}
     unique = []
     for job in jobs:
-        key = job.url or job.fingerprint()
-        if not key or key in seen:
+        key = canonical_url(job.url) or job.fingerprint()
+        first = by_key.get(key)
+        if first is None:
+            by_key[key] = job
+            unique.append(job)
             continue
-        seen.add(key)
-        unique.append(job)
+        for field, value in job.as_dict().items():
+            if value and not getattr(first, field):
+                setattr(first, field, value)
     return unique
-
-
-def write_jobs_csv(path: str, jobs: Iterable[Job]) -> None:
-    with open(path, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.DictWriter(f, fieldnames=CSV_HEADERS)
-        writer.writeheader()
-        for job in jobs:
-            writer.writerow(job.to_csv_row())